@@ -0,0 +1,91 @@
+"""
+Fingerprinted static assets
+build_assets.py writes hashed copies of the CSS/JS bundles (plus .gz/.br
+siblings) under static/dist/ and a manifest mapping source paths to them.
+asset_url() resolves through that manifest, and the static route serves
+hashed files and content-addressed uploads with a year-long immutable
+Cache-Control, picking a precompressed sibling when the browser accepts it.
+"""
+import json
+import mimetypes
+import os
+import re
+from flask import request, send_from_directory, url_for
+
+MANIFEST = os.path.join('dist', 'manifest.json')
+
+# Uploads named by the SHA-256 of their bytes (and their variants) never change
+HASHED_UPLOAD = re.compile(r'^uploads/[0-9a-f]{64}(_[a-z]+)?\.[a-z]+$')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Precompressed siblings written by build_assets.py, best first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+class Assets:
+    """Flask glue: asset_url()/has_asset() for templates and the static route"""
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.hashed = set()
+        self._manifest_mtime = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.static_folder = app.static_folder
+        self.manifest_path = os.path.join(app.static_folder, MANIFEST)
+        self._load_manifest()
+        app.view_functions['static'] = self.send_static
+        app.context_processor(lambda: dict(asset_url=self.url, has_asset=self.has_asset))
+
+    def _load_manifest(self):
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            self.manifest, self.hashed, self._manifest_mtime = {}, set(), None
+            return
+        if mtime != self._manifest_mtime:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+            self.hashed = set(self.manifest.values())
+            self._manifest_mtime = mtime
+
+    def has_asset(self, path):
+        if self.app.debug:
+            self._load_manifest()
+        return path in self.manifest
+
+    def url(self, path):
+        """Hashed URL for a built asset, or the plain static URL before a build"""
+        if self.app.debug:
+            self._load_manifest()
+        return url_for('static', filename=self.manifest.get(path, path))
+
+    def is_immutable(self, filename):
+        return filename in self.hashed or HASHED_UPLOAD.match(filename) is not None
+
+    def send_static(self, filename):
+        if not self.is_immutable(filename):
+            return self.app.send_static_file(filename)
+
+        served, encoding = filename, None
+        if filename in self.hashed:
+            for name, suffix in ENCODINGS:
+                if name in request.accept_encodings and os.path.exists(os.path.join(self.static_folder, filename + suffix)):
+                    served, encoding = filename + suffix, name
+                    break
+
+        response = send_from_directory(
+            self.static_folder, served,
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+            max_age=IMMUTABLE_MAX_AGE,
+        )
+        if encoding:
+            response.content_encoding = encoding
+        if filename in self.hashed:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
@@ -0,0 +1,65 @@
+"""
+Recompute the denormalized Post.comment_count / Post.share_count columns and
+Category.post_count
+Safe to re-run at any time to repair counters that have drifted. The columns
+themselves come from migrate_schema.py, which must have been run first.
+Usage: python backfill_counts.py [batch_size]
+"""
+import sys
+from sqlalchemy import func, select
+from app import app, db
+from models import Post, Comment, Share, Category
+from migrate_schema import require_migrations
+
+BATCH_SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+def backfill_counters():
+    """Recompute both counters one range of post ids at a time"""
+    post_table = Post.__table__
+    comment_total = select(func.count(Comment.id)).where(Comment.post_id == post_table.c.id).scalar_subquery()
+    share_total = select(func.count(Share.id)).where(Share.post_id == post_table.c.id).scalar_subquery()
+
+    with db.engine.connect() as connection:
+        low, high = connection.execute(select(func.min(post_table.c.id), func.max(post_table.c.id))).one()
+
+    if low is None:
+        print("✅ No posts to backfill!")
+        return
+
+    updated = 0
+    start = low
+    while start <= high:
+        end = start + BATCH_SIZE
+        # Each batch is its own short transaction so writers are never blocked for long
+        with db.engine.begin() as connection:
+            result = connection.execute(
+                post_table.update()
+                .where(post_table.c.id >= start, post_table.c.id < end)
+                .values(comment_count=comment_total, share_count=share_total)
+            )
+            updated += result.rowcount
+        print(f"  • posts {start}-{end - 1} done ({updated} updated so far)")
+        start = end
+
+    print(f"✅ Recomputed counters for {updated} posts!")
+
+def backfill_category_counts():
+    """Recompute every category's post count; there are only a handful of categories"""
+    category_table = Category.__table__
+    post_total = select(func.count(Post.id)).where(Post.category_id == category_table.c.id).scalar_subquery()
+    with db.engine.begin() as connection:
+        updated = connection.execute(category_table.update().values(post_count=post_total)).rowcount
+    print(f"✅ Recomputed post counts for {updated} categories!")
+
+if __name__ == '__main__':
+    try:
+        with app.app_context():
+            # The category table (007) and the counter columns (008)
+            require_migrations(7, 8)
+            backfill_counters()
+            backfill_category_counts()
+        print("\n🎉 Counter backfill complete!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        print("Please make sure the database file is not locked by another process.")
+        sys.exit(1)
@@ -0,0 +1,82 @@
+"""
+Generate the resized WebP/JPEG variants for posts uploaded before they existed
+Images are processed in parallel across CPU cores; safe to re-run, and
+--force regenerates variants that are already recorded
+Usage: python backfill_images.py [--force] [workers]
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app import app, db
+from models import Post, Upload
+from images import Image, generate_variants
+from storage import storage_from_config
+
+FORCE = '--force' in sys.argv
+ARGS = [arg for arg in sys.argv[1:] if arg != '--force']
+WORKERS = int(ARGS[0]) if ARGS else os.cpu_count()
+
+def pending_images():
+    """Distinct image filenames used by a post with no recorded variants"""
+    query = db.session.query(Post.image_filename).filter(Post.image_filename.isnot(None))
+    if not FORCE:
+        query = query.filter(Post.image_variants.is_(None))
+    return [filename for filename, in query.distinct().order_by(Post.image_filename)]
+
+worker_storage = None
+
+def init_worker():
+    # Each process opens its own backend; S3 clients cannot be shared or pickled
+    global worker_storage
+    worker_storage = storage_from_config(app.config)
+
+def process_image(filename):
+    return generate_variants(worker_storage, filename)
+
+def backfill_images():
+    storage = app.extensions['storage']
+    filenames = pending_images()
+    if not filenames:
+        print("✅ Every post image already has its variants!")
+        return
+
+    print(f"📋 Generating variants for {len(filenames)} images with {WORKERS} workers...")
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=WORKERS, initializer=init_worker) as executor:
+        futures = {}
+        for filename in filenames:
+            if not storage.exists(filename):
+                print(f"  ⚠️  {filename} is missing, skipped")
+                failed += 1
+                continue
+            futures[executor.submit(process_image, filename)] = filename
+
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                variants = ','.join(future.result())
+            except Exception as e:
+                print(f"  ❌ {filename}: {e}")
+                failed += 1
+                continue
+            # Every post sharing this (deduplicated) upload gets the variants
+            Post.query.filter_by(image_filename=filename).update({'image_variants': variants}, synchronize_session=False)
+            Upload.query.filter_by(filename=filename).update({'variants': variants}, synchronize_session=False)
+            db.session.commit()
+            done += 1
+            print(f"  • {filename}: {variants}")
+
+    print(f"✅ Generated variants for {done} images ({failed} skipped or failed)")
+
+if __name__ == '__main__':
+    if Image is None:
+        print("❌ Pillow is not installed: pip install Pillow")
+        sys.exit(1)
+    try:
+        with app.app_context():
+            backfill_images()
+        print("\n🎉 Image backfill complete!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        print("Please run migrate_schema.py first if the image_variants column is missing.")
+        sys.exit(1)
@@ -1,15 +1,12 @@
 import mysql.connector
 from mysql.connector import Error
+from database import mysql_connect_kwargs
 
 def create_database():
     """Create the student_news database"""
     try:
         # Connect to MySQL server (without database)
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='root'
-        )
+        connection = mysql.connector.connect(**mysql_connect_kwargs(include_database=False))
         
         if connection.is_connected():
             cursor = connection.cursor()
@@ -27,12 +24,7 @@ def create_database():
 def create_tables():
     """Create all tables for Student News"""
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='student_news',
-            user='root',
-            password='root'
-        )
+        connection = mysql.connector.connect(**mysql_connect_kwargs())
         
         if connection.is_connected():
             cursor = connection.cursor()
@@ -0,0 +1,138 @@
+"""
+Load test: page latency during a login storm
+Models a server with a fixed number of request threads (like gunicorn's
+gthread workers) in front of the app, then measures anonymous page latency
+while many clients hammer POST /login, in three runs:
+  quiet   no logins, for reference
+  inline  hashing on the request threads with no queue limit (the old way)
+  pool    hashing in the bounded process pool (PASSWORD_HASH_WORKERS/QUEUE)
+Page latency includes the time spent waiting for a free request thread.
+Usage: python bench_login_storm.py [--seconds N] [--request-threads N]
+       [--storm-clients N] [--page-clients N]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'storm.db')}"
+os.environ.pop('DATABASE_REPLICA_URLS', None)
+os.environ['PAGE_CACHE_BACKEND'] = 'none'
+os.environ['IMAGE_WORKERS'] = '0'
+
+import app as app_module
+from app import app, db
+from generate_data import generate
+from password_hashing import default_workers
+
+USERS, POSTS = 200, 2000
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+def handle(method, path, data=None):
+    return app.test_client().open(path, method=method, data=data).status_code
+
+def run(args, storm):
+    """Drive page clients (and login clients if ``storm``); return the counters"""
+    server = ThreadPoolExecutor(max_workers=args.request_threads)
+    deadline = time.perf_counter() + args.seconds
+    lock = threading.Lock()
+    results = {'latencies': [], 'logins': 0, 'rejected': 0, 'failed': 0}
+
+    def page_client(seed):
+        rng, latencies = random.Random(seed), []
+        while time.perf_counter() < deadline:
+            path = '/news' if rng.random() < 0.5 else f'/post/{rng.randint(1, POSTS)}'
+            started = time.perf_counter()
+            server.submit(handle, 'GET', path).result()
+            latencies.append((time.perf_counter() - started) * 1000)
+        with lock:
+            results['latencies'].extend(latencies)
+
+    def login_client(seed):
+        rng, counts = random.Random(seed), {'logins': 0, 'rejected': 0, 'failed': 0}
+        while time.perf_counter() < deadline:
+            data = {'username': f'user{rng.randint(1, USERS)}', 'password': 'password123'}
+            status = server.submit(handle, 'POST', '/login', data).result()
+            if status == 302:
+                counts['logins'] += 1
+            elif status == 503:
+                counts['rejected'] += 1
+                time.sleep(1)  # an impatient user clicking again, well before Retry-After
+            else:
+                counts['failed'] += 1
+        with lock:
+            for name, value in counts.items():
+                results[name] += value
+
+    threads = [threading.Thread(target=page_client, args=(i,)) for i in range(args.page_clients)]
+    if storm:
+        threads += [threading.Thread(target=login_client, args=(1000 + i,)) for i in range(args.storm_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+    results['latencies'].sort()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Page latency during a login storm")
+    parser.add_argument('--seconds', type=float, default=8)
+    parser.add_argument('--request-threads', type=int, default=8)
+    parser.add_argument('--storm-clients', type=int, default=32)
+    parser.add_argument('--page-clients', type=int, default=4)
+    args = parser.parse_args()
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    hasher = app_module.password_hasher
+    with app.app_context():
+        db.create_all()
+        generate(db.engine, users=USERS, posts=POSTS, log=lambda message: None)
+
+    print("\n" + "="*60)
+    print("🌩️  LOGIN STORM BENCHMARK")
+    print("="*60)
+    workers = app.config.get('PASSWORD_HASH_WORKERS', default_workers())
+    print(f"{args.seconds:g}s per run, {args.request_threads} request threads, {args.page_clients} page clients, "
+          f"{args.storm_clients} login clients, {os.cpu_count()} CPUs\n")
+
+    runs = [
+        ('quiet', False, (workers, app.config.get('PASSWORD_HASH_QUEUE'))),
+        ('inline', True, (0, args.storm_clients + args.request_threads)),
+        ('pool', True, (workers, app.config.get('PASSWORD_HASH_QUEUE'))),
+    ]
+    rows = {}
+    for name, storm, (pool_workers, queue) in runs:
+        hasher.configure(pool_workers, queue)
+        print(f"📋 Running '{name}' ({pool_workers} hash workers, queue {hasher.queue_limit})...")
+        rows[name] = run(args, storm)
+    hasher.shutdown()
+
+    print(f"\n{'run':<8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'pages/s':>9}{'logins/s':>10}{'503/s':>8}")
+    for name, r in rows.items():
+        latencies = r['latencies']
+        print(f"{name:<8}{percentile(latencies, 0.50):>9.1f}{percentile(latencies, 0.95):>9.1f}"
+              f"{percentile(latencies, 0.99):>9.1f}{len(latencies) / args.seconds:>9.0f}"
+              f"{r['logins'] / args.seconds:>10.1f}{r['rejected'] / args.seconds:>8.1f}")
+        if r['failed']:
+            print(f"  ⚠️  {r['failed']} logins failed outright")
+
+    quiet, inline, pool = (percentile(rows[name]['latencies'], 0.95) for name in ('quiet', 'inline', 'pool'))
+    print()
+    if quiet:
+        print(f"✅ page p95 during the storm: {inline / quiet:.1f}x quiet with inline hashing, "
+              f"{pool / quiet:.1f}x quiet with the pool")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Benchmark every route at several database sizes
+Seeds a throwaway database with generate_data.py for each size, then drives
+the routes through the Flask test client and reports p50/p95/p99 latency,
+SQL statements and rows fetched per request. Results are written as JSON;
+pass --compare to flag regressions against an earlier run.
+The page cache is off (PAGE_CACHE_BACKEND=none) so every request does its
+full work; set PAGE_CACHE_BACKEND=memory to measure cached pages instead.
+Usage: python bench_routes.py [--sizes small,medium,large] [--requests N]
+       [--output FILE] [--compare BASELINE.json]
+       python bench_routes.py --compare BASELINE.json CURRENT.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Users, posts per size; comments and shares per post follow the generator's defaults
+SIZES = {
+    'small': (200, 2000),
+    'medium': (2000, 20000),
+    'large': (20000, 200000),
+}
+
+# Route name -> (method, path template, form data); {post}/{user} are random ids.
+# All but login run as user1, an admin. Category 3 is 'Events', as generated.
+ROUTES = {
+    'index': ('GET', '/', None),
+    'news': ('GET', '/news', None),
+    'news_category': ('GET', '/news?category=Sports', None),
+    'view_post': ('GET', '/post/{post}', None),
+    'post_comments': ('GET', '/post/{post}/comments', None),
+    'profile': ('GET', '/profile/{user}', None),
+    'admin_dashboard': ('GET', '/admin', None),
+    'create_post': ('POST', '/post/create', {'title': 'Benchmark post', 'content': 'Benchmark content',
+                                             'category': '3'}),
+    'add_comment': ('POST', '/post/{post}/comment', {'content': 'Benchmark comment'}),
+    'share_post': ('POST', '/post/{post}/share', None),
+    'add_comment_api': ('POST', '/api/post/{post}/comment', {'content': 'Benchmark comment'}),
+    'share_post_api': ('POST', '/api/post/{post}/share', None),
+    'login': ('POST', '/login', {'username': 'user1', 'password': 'password123'}),
+}
+
+# A route regresses when its p95 grows by more than this fraction, or when it
+# issues more statements per request than before
+P95_THRESHOLD = 0.20
+STATEMENT_THRESHOLD = 0.5
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+class QueryCounter:
+    """Counts statements and fetched rows on every engine of the app"""
+
+    def __init__(self, engines):
+        self.statements = 0
+        self.rows = 0
+        for engine in engines:
+            self._listen(engine)
+
+    def _listen(self, engine):
+        from sqlalchemy import event
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            self.statements += 1
+            # Server drivers buffer SELECT results, so rowcount is the rows fetched
+            if engine.dialect.name != 'sqlite' and statement.lstrip().upper().startswith('SELECT'):
+                self.rows += max(cursor.rowcount, 0)
+
+        if engine.dialect.name == 'sqlite':
+            # sqlite3 reports no rowcount for SELECTs; its row factory sees every fetched row
+            @event.listens_for(engine, 'connect')
+            def _row_factory(dbapi_connection, connection_record):
+                def count_row(cursor, row):
+                    self.rows += 1
+                    return row
+                dbapi_connection.row_factory = count_row
+
+        engine.dispose()
+
+    def snapshot(self):
+        return self.statements, self.rows
+
+def run_route(app, client, counter, name, count, users, posts, rng):
+    """Drive one route ``count`` times and summarise latency and query numbers"""
+    method, template, data = ROUTES[name]
+    latencies, statements, rows, errors = [], [], [], 0
+    for _ in range(count):
+        path = template.format(post=rng.randint(1, posts), user=rng.randint(1, users))
+        request_client = app.test_client() if name == 'login' else client
+        before = counter.snapshot()
+        started = time.perf_counter()
+        response = request_client.open(path, method=method, data=data)
+        latencies.append((time.perf_counter() - started) * 1000)
+        after = counter.snapshot()
+        statements.append(after[0] - before[0])
+        rows.append(after[1] - before[1])
+        if response.status_code >= 400:
+            errors += 1
+        # Flash messages would pile up in the session cookie across POSTs
+        with client.session_transaction() as session:
+            session.pop('_flashes', None)
+    latencies.sort()
+    return {
+        'requests': count,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'statements': round(sum(statements) / len(statements), 2),
+        'max_statements': max(statements),
+        'rows': round(sum(rows) / len(rows), 1),
+    }
+
+def bench_size(app, db, counter, size, count, warmup, seed):
+    from generate_data import generate
+    users, posts = SIZES[size]
+    print(f"\n📋 Seeding '{size}': {users:,} users, {posts:,} posts...")
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        generate(db.engine, users=users, posts=posts, seed=seed, log=lambda message: None)
+        print(f"  • seeded in {time.perf_counter() - started:.1f}s")
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'user1', 'password': 'password123'})
+    rng = random.Random(seed)
+    results = {}
+    print(f"\n{'route':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'stmts':>8}{'rows':>9}{'errors':>8}")
+    for name in ROUTES:
+        if warmup:
+            run_route(app, client, counter, name, warmup, users, posts, rng)
+        result = results[name] = run_route(app, client, counter, name, count, users, posts, rng)
+        print(f"{name:<18}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+              f"{result['statements']:>8.1f}{result['rows']:>9.1f}{result['errors']:>8}")
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(baseline, current):
+    """Print per-route changes; return the number of regressions"""
+    regressions = 0
+    print("\n" + "="*60)
+    print(f"📊 COMPARING {baseline['meta'].get('commit')} → {current['meta'].get('commit')}")
+    print("="*60)
+    for size, routes in current['results'].items():
+        if size not in baseline['results']:
+            continue
+        print(f"\n{size}:")
+        for name, now in routes.items():
+            before = baseline['results'][size].get(name)
+            if before is None:
+                continue
+            problems = []
+            if before['p95_ms'] and now['p95_ms'] > before['p95_ms'] * (1 + P95_THRESHOLD):
+                problems.append(f"p95 {before['p95_ms']:.2f} → {now['p95_ms']:.2f} ms")
+            if now['statements'] > before['statements'] + STATEMENT_THRESHOLD:
+                problems.append(f"statements {before['statements']} → {now['statements']}")
+            change = (now['p95_ms'] / before['p95_ms'] - 1) * 100 if before['p95_ms'] else 0
+            if problems:
+                regressions += 1
+                print(f"  ❌ {name:<18}{'; '.join(problems)}")
+            else:
+                print(f"  ✅ {name:<18}p95 {change:+.0f}%, {now['statements']} statements")
+    print()
+    if regressions:
+        print(f"❌ {regressions} route regressions")
+    else:
+        print("🎉 No regressions!")
+    return regressions
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every route at several database sizes")
+    parser.add_argument('--sizes', default='small,medium', help=f"comma-separated: {', '.join(SIZES)}")
+    parser.add_argument('--requests', type=int, default=100, help="measured requests per route")
+    parser.add_argument('--warmup', type=int, default=5, help="unmeasured requests per route first")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="JSON results file (default bench-<timestamp>.json)")
+    parser.add_argument('--compare', nargs='+', metavar='FILE',
+                        help="baseline to compare this run against, or two saved runs")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        return 1 if compare(load(args.compare[0]), load(args.compare[1])) else 0
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size {unknown[0]!r}; expected {', '.join(SIZES)}")
+
+    # Always a throwaway database: every size drops and recreates the tables
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.pop('DATABASE_REPLICA_URLS', None)
+    os.environ.setdefault('PAGE_CACHE_BACKEND', 'none')
+    os.environ['IMAGE_WORKERS'] = '0'
+    from app import app, db
+    import sqlalchemy
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        counter = QueryCounter(db.engines.values())
+
+    print("\n" + "="*60)
+    print("⏱️  ROUTE BENCHMARK")
+    print("="*60)
+    print(f"{args.requests} requests per route (+{args.warmup} warmup), "
+          f"page cache: {app.config['PAGE_CACHE_BACKEND']}")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'requests': args.requests,
+            'seed': args.seed,
+            'page_cache': app.config['PAGE_CACHE_BACKEND'],
+            'sizes': {size: dict(zip(('users', 'posts'), SIZES[size])) for size in sizes},
+        },
+        'results': {},
+    }
+    for size in sizes:
+        report['results'][size] = bench_size(app, db, counter, size, args.requests, args.warmup, args.seed)
+
+    output = args.output or f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {output}")
+
+    if args.compare:
+        return 1 if compare(load(args.compare[0]), report) else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Benchmark SQLite read/write throughput with and without the tuning profile
+Builds a fresh database per profile, then runs reader threads (the news
+listing and a post page with its comments) alongside writer threads (a
+comment insert plus its counter update, as add_comment does) for a fixed
+time and reports operations per second and lock errors for each profile.
+Usage: python bench_sqlite.py [seconds] [readers] [writers]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from app import db
+from models import User, Post, Comment
+from sqlite_tuning import PROFILES, apply_pragmas, checkpoint
+from generate_data import generate
+
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+READERS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+WRITERS = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+SEED_USERS = 50
+SEED_POSTS = 2000
+SEED_COMMENTS_PER_POST = 5
+
+def seed(engine):
+    """Create the schema and a few thousand rows with the synthetic data generator"""
+    db.metadata.create_all(engine)
+    generate(engine, users=SEED_USERS, posts=SEED_POSTS, comments=f'fixed:{SEED_COMMENTS_PER_POST}',
+             shares='fixed:0', log=lambda message: None)
+
+post_table, user_table, comment_table = Post.__table__, User.__table__, Comment.__table__
+
+LISTING = (select(post_table, user_table.c.username)
+           .join(user_table, user_table.c.id == post_table.c.author_id)
+           .order_by(post_table.c.created_at.desc(), post_table.c.id.desc()).limit(9))
+
+def read_once(connection, rng):
+    connection.execute(LISTING).fetchall()
+    post_id = rng.randint(1, SEED_POSTS)
+    connection.execute(select(post_table).where(post_table.c.id == post_id)).fetchall()
+    connection.execute(
+        select(comment_table).where(comment_table.c.post_id == post_id)
+        .order_by(comment_table.c.created_at.desc()).limit(20)
+    ).fetchall()
+
+def write_once(engine, rng):
+    post_id = rng.randint(1, SEED_POSTS)
+    with engine.begin() as connection:
+        connection.execute(comment_table.insert().values(
+            content='Benchmark comment', author_id=rng.randint(1, SEED_USERS),
+            post_id=post_id, created_at=datetime.utcnow()))
+        connection.execute(post_table.update().where(post_table.c.id == post_id).values(
+            comment_count=post_table.c.comment_count + 1, last_activity_at=datetime.utcnow()))
+
+def run_workload(engine):
+    """Run readers and writers together for SECONDS; return per-kind counters"""
+    deadline = time.perf_counter() + SECONDS
+    results = {'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0}
+    lock = threading.Lock()
+
+    def reader(seed_value):
+        rng, done, errors = random.Random(seed_value), 0, 0
+        while time.perf_counter() < deadline:
+            try:
+                with engine.connect() as connection:
+                    read_once(connection, rng)
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            results['reads'] += done
+            results['read_errors'] += errors
+
+    def writer(seed_value):
+        rng, done, errors = random.Random(seed_value), 0, 0
+        while time.perf_counter() < deadline:
+            try:
+                write_once(engine, rng)
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            results['writes'] += done
+            results['write_errors'] += errors
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(READERS)]
+    threads += [threading.Thread(target=writer, args=(100 + i,)) for i in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def bench_profile(name):
+    directory = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                           pool_size=READERS + WRITERS, max_overflow=0)
+    apply_pragmas(engine, PROFILES[name])
+    seed(engine)
+    results = run_workload(engine)
+    if PROFILES[name].get('journal_mode') == 'WAL':
+        checkpoint(engine, 'TRUNCATE')
+    engine.dispose()
+    return results
+
+def main():
+    print("\n" + "="*60)
+    print("⏱️  SQLITE PROFILE BENCHMARK")
+    print("="*60)
+    print(f"{SECONDS:g}s per profile, {READERS} readers + {WRITERS} writers, "
+          f"{SEED_POSTS} posts / {SEED_POSTS * SEED_COMMENTS_PER_POST} comments\n")
+
+    rows = {}
+    for name in ('default', 'production'):
+        print(f"📋 Running '{name}' profile...")
+        rows[name] = bench_profile(name)
+
+    print(f"\n{'profile':<12}{'reads/s':>10}{'writes/s':>10}{'read errs':>11}{'write errs':>12}")
+    for name, r in rows.items():
+        print(f"{name:<12}{r['reads'] / SECONDS:>10.0f}{r['writes'] / SECONDS:>10.0f}"
+              f"{r['read_errors']:>11}{r['write_errors']:>12}")
+
+    base, tuned = rows['default'], rows['production']
+    for kind in ('reads', 'writes'):
+        if base[kind]:
+            print(f"✅ {kind}: {tuned[kind] / base[kind]:.1f}x with the production profile")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Build fingerprinted, precompressed static assets
+Compiles Tailwind down to the classes the templates and scripts actually use,
+bundles it with css/app.css into css/site.css, and writes every asset to
+static/dist/ under a content-hashed name with .gz/.br siblings, plus the
+manifest asset_url() reads. Run it whenever templates, CSS or JS change.
+Needs the Tailwind CLI: a `tailwindcss` binary on PATH (pip install
+pytailwindcss), TAILWIND_CLI=/path/to/tailwindcss, or npx.
+Usage: python build_assets.py [--skip-tailwind]
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC = os.path.join(ROOT, 'static')
+DIST = os.path.join(STATIC, 'dist')
+
+# Assets copied as they are, relative to static/
+ASSETS = ['css/app.css', 'js/admin.js', 'js/image-preview.js', 'js/comments.js', 'js/post-actions.js']
+
+# Compiled bundle: Tailwind output followed by these stylesheets
+SITE_CSS = 'css/site.css'
+SITE_CSS_PARTS = ['css/app.css']
+TAILWIND_INPUT = 'css/tailwind.css'
+TAILWIND_VERSION = '3.4.1'
+
+SKIP_TAILWIND = '--skip-tailwind' in sys.argv
+
+def tailwind_command():
+    """Command line prefix for whichever Tailwind CLI is available"""
+    if os.environ.get('TAILWIND_CLI'):
+        return [os.environ['TAILWIND_CLI']]
+    if shutil.which('tailwindcss'):
+        return ['tailwindcss']
+    if shutil.which('npx'):
+        return ['npx', '--yes', f'tailwindcss@{TAILWIND_VERSION}']
+    return None
+
+def compile_tailwind():
+    command = tailwind_command()
+    if command is None:
+        raise RuntimeError("Tailwind CLI not found: pip install pytailwindcss, or set TAILWIND_CLI")
+    fd, output = tempfile.mkstemp(suffix='.css')
+    os.close(fd)
+    try:
+        subprocess.run(command + [
+            '-c', os.path.join(ROOT, 'tailwind.config.js'),
+            '-i', os.path.join(STATIC, TAILWIND_INPUT),
+            '-o', output, '--minify',
+        ], cwd=ROOT, check=True)
+        with open(output, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(output)
+
+def read_static(path):
+    with open(os.path.join(STATIC, path), 'rb') as f:
+        return f.read()
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def fingerprint(path, data):
+    """Write data as dist/<name>.<hash>.<ext> with compressed siblings; return the static path"""
+    stem, ext = os.path.splitext(path)
+    hashed = f"dist/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+    target = os.path.join(STATIC, hashed)
+    write(target, data)
+    # mtime=0 keeps the .gz byte-identical across builds
+    write(target + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        write(target + '.br', brotli.compress(data, quality=11))
+    return hashed
+
+def read_manifest():
+    try:
+        with open(os.path.join(DIST, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def remove_stale(manifest, previous):
+    """
+    Delete hashed files from earlier builds, keeping the previous build's so
+    pages rendered (or cached) just before the deploy still load
+    """
+    paths = set(manifest.values()) | set(previous.values())
+    keep = {os.path.join(STATIC, path) for path in paths}
+    keep |= {path + suffix for path in keep for suffix in ('.gz', '.br')}
+    keep.add(os.path.join(DIST, 'manifest.json'))
+    removed = 0
+    for directory, _, filenames in os.walk(DIST):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if path not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+def build():
+    previous = read_manifest()
+    manifest = {}
+    if SKIP_TAILWIND:
+        print("⚠️  Skipping Tailwind; pages keep using the in-browser compiler")
+    else:
+        print("🎨 Compiling Tailwind...")
+        site_css = compile_tailwind() + b'\n' + b'\n'.join(read_static(part) for part in SITE_CSS_PARTS)
+        manifest[SITE_CSS] = fingerprint(SITE_CSS, site_css)
+
+    for path in ASSETS:
+        manifest[path] = fingerprint(path, read_static(path))
+
+    for path, hashed in manifest.items():
+        size = os.path.getsize(os.path.join(STATIC, hashed))
+        gz_size = os.path.getsize(os.path.join(STATIC, hashed + '.gz'))
+        print(f"  • {path} → {hashed} ({size:,} bytes, {gz_size:,} gzipped)")
+
+    # Replace the manifest atomically so running servers never read half of it
+    fd, tmp_path = tempfile.mkstemp(dir=DIST, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(DIST, 'manifest.json'))
+
+    removed = remove_stale(manifest, previous)
+    print(f"✅ Wrote {len(manifest)} assets and the manifest ({removed} stale files removed)")
+    if brotli is None:
+        print("⚠️  brotli is not installed: only .gz siblings were written (pip install brotli)")
+
+if __name__ == '__main__':
+    try:
+        os.makedirs(DIST, exist_ok=True)
+        build()
+        print("\n🎉 Assets built!")
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
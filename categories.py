@@ -0,0 +1,92 @@
+"""
+Post categories, cached per process
+Every page renders the category list (the nav and the /news chips show each
+category's post count), so it is read from a process-level snapshot rather
+than queried per request. Counts are maintained incrementally by
+models._maintain_category_counts; commits that add, change or re-count a
+category drop this process's snapshot straight away, other processes reload
+theirs within CATEGORY_CACHE_TTL.
+"""
+import threading
+import time
+from collections import namedtuple
+from models import db, Category
+from database import primary_reads
+
+# The categories everything starts with; create_db.py and migrations seed them
+DEFAULT_CATEGORIES = ['Academic', 'Sports', 'Events', 'Clubs', 'Announcements', 'Other']
+
+CategoryInfo = namedtuple('CategoryInfo', 'id name post_count')
+
+def ensure_categories(session, names):
+    """{name: Category} for ``names``, adding any that do not exist yet"""
+    existing = {category.name: category for category in
+                session.query(Category).filter(Category.name.in_(set(names)))}
+    for name in names:
+        if name not in existing:
+            existing[name] = Category(name=name)
+            session.add(existing[name])
+    session.flush()
+    return existing
+
+class CategoryCache:
+    """Process-level snapshot of the category list with post counts"""
+
+    def __init__(self, app=None):
+        self.ttl = 60
+        self._snapshot = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CATEGORY_CACHE_TTL', 60)
+        app.extensions['category_cache'] = self
+        db.event.listen(db.session, 'after_commit', self._invalidate_committed)
+        db.event.listen(db.session, 'after_soft_rollback', self._forget_changes)
+
+    def _load(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot[0] <= self.ttl:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - snapshot[0] <= self.ttl:
+                return snapshot
+            generation = self._generation
+            # Shared by every request until it expires, so never from a lagging replica
+            with primary_reads():
+                rows = db.session.query(Category.id, Category.name, Category.post_count).order_by(Category.id).all()
+            categories = tuple(CategoryInfo(*row) for row in rows)
+            snapshot = (time.monotonic(), categories,
+                        {category.name: category for category in categories},
+                        {category.id: category for category in categories})
+            # An invalidation that landed during the query wins
+            if generation == self._generation:
+                self._snapshot = snapshot
+            return snapshot
+
+    def all(self):
+        return self._load()[1]
+
+    def by_name(self, name):
+        return self._load()[2].get(name)
+
+    def get(self, category_id):
+        return self._load()[3].get(category_id)
+
+    def total_posts(self):
+        return sum(category.post_count for category in self.all())
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def _invalidate_committed(self, session):
+        if session.info.pop('stale_categories', False):
+            self.invalidate()
+
+    def _forget_changes(self, session, previous_transaction):
+        session.info.pop('stale_categories', None)
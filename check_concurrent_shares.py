@@ -0,0 +1,115 @@
+"""
+Check that concurrent shares of one post are recorded exactly once
+Fires a burst of simultaneous share requests from one logged-in user at one
+post (through the form route and the JSON route), then for several users at
+once, and checks that:
+  - no request fails with a 500
+  - each user ends up with exactly one share row for the post
+  - the post's share_count matches the share rows
+Usage: python check_concurrent_shares.py [--clients N] [--users N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'shares.db')}"
+os.environ.pop('DATABASE_REPLICA_URLS', None)
+os.environ['PAGE_CACHE_BACKEND'] = 'none'
+os.environ['IMAGE_WORKERS'] = '0'
+os.environ['REQUEST_LOG'] = '0'
+
+from sqlalchemy import func
+from app import app, db
+from generate_data import generate
+from models import Post, Share
+
+def check(label, condition):
+    print(f"{'✅' if condition else '❌'} {label}")
+    return bool(condition)
+
+def logged_in_clients(username, count):
+    """``count`` test clients sharing one login session"""
+    first = app.test_client()
+    first.post('/login', data={'username': username, 'password': 'password123'})
+    cookie = first.get_cookie('session')
+    clients = [first]
+    for _ in range(count - 1):
+        client = app.test_client()
+        client.set_cookie('session', cookie.value)
+        clients.append(client)
+    return clients
+
+def burst(clients, path):
+    """POST ``path`` from every client at the same moment; return the status codes"""
+    barrier = threading.Barrier(len(clients))
+    statuses = [None] * len(clients)
+
+    def fire(index, client):
+        barrier.wait()
+        statuses[index] = client.post(path).status_code
+
+    threads = [threading.Thread(target=fire, args=(index, client)) for index, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+def share_rows(post_id):
+    with app.app_context():
+        per_user = dict(db.session.query(Share.user_id, func.count(Share.id))
+                        .filter(Share.post_id == post_id).group_by(Share.user_id).all())
+        share_count = db.session.get(Post, post_id).share_count
+    return per_user, share_count
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent shares of one post")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--users', type=int, default=4)
+    args = parser.parse_args()
+
+    # Server errors become 500 responses, as in production
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        generate(db.engine, users=args.users + 1, posts=3, comments='fixed:0', shares='fixed:0',
+                 log=lambda message: None)
+
+    print("\n" + "="*60)
+    print("🔁 CHECKING CONCURRENT SHARES")
+    print("="*60 + "\n")
+
+    ok = True
+    for post_id, path in ((1, '/post/1/share'), (2, '/api/post/2/share')):
+        statuses = burst(logged_in_clients('user1', args.clients), path)
+        per_user, share_count = share_rows(post_id)
+        ok &= check(f"{path}: {args.clients} simultaneous shares, no server errors "
+                    f"({', '.join(f'{status}×{statuses.count(status)}' for status in sorted(set(statuses)))})",
+                    all(status < 500 for status in statuses))
+        ok &= check(f"{path}: exactly one share row {per_user}", per_user == {1: 1})
+        ok &= check(f"{path}: share_count is {share_count}", share_count == 1)
+
+    # Several users at once: one row each, and the counter sees every one
+    clients = []
+    for user_id in range(2, args.users + 2):
+        clients += logged_in_clients(f'user{user_id}', max(1, args.clients // args.users))
+    statuses = burst(clients, '/api/post/3/share')
+    per_user, share_count = share_rows(3)
+    ok &= check(f"{args.users} users, {len(clients)} simultaneous shares, no server errors",
+                all(status < 500 for status in statuses))
+    ok &= check(f"one share row per user {per_user}",
+                per_user == {user_id: 1 for user_id in range(2, args.users + 2)})
+    ok &= check(f"share_count is {share_count}", share_count == args.users)
+
+    print()
+    if not ok:
+        print("❌ Concurrent shares were lost, duplicated or failed")
+        return 1
+    print("🎉 Concurrent shares are recorded exactly once!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Check that every query the routes issue is served by an index
+Seeds a throwaway SQLite database, drives each route through the Flask test
+client, runs EXPLAIN QUERY PLAN on every statement it captured and exits
+non-zero if any of them falls back to a full table scan or a temp-table sort.
+It also feeds the paged routes malformed ?after= cursors, which must be
+ignored rather than reach the query.
+Usage: python check_query_plans.py
+"""
+import base64
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'query_plans.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import event
+from app import app, db
+import create_db
+
+# Route name -> list of (method, path, form data) requests to drive, logged in
+# as admin except for login, which needs a client that is not logged in yet
+ROUTES = {
+    'index': [('GET', '/', None)],
+    'news': [('GET', '/news', None), ('GET', '/news?category=Sports', None)],
+    'search': [('GET', '/search?q=team', None), ('GET', '/search?q=team&category=Sports', None)],
+    'view_post': [('GET', '/post/2', None)],
+    'post_comments': [('GET', '/post/2/comments', None)],
+    'profile': [('GET', '/profile/2', None)],
+    'admin_dashboard': [('GET', '/admin', None)],
+    'admin_users_api': [('GET', '/admin/api/users', None)],
+    'admin_posts_api': [('GET', '/admin/api/posts', None)],
+    'admin_comments_api': [('GET', '/admin/api/comments', None)],
+    'add_comment': [('POST', '/post/2/comment', {'content': 'Checking query plans'})],
+    'share_post': [('POST', '/post/3/share', None)],
+    'add_comment_api': [('POST', '/api/post/2/comment', {'content': 'Checking query plans'})],
+    'share_post_api': [('POST', '/api/post/4/share', None)],
+    'login': [('POST', '/login', {'username': 'admin', 'password': 'admin123'})],
+}
+
+# Paged routes and cursors that decode but do not match their (created_at, id) key
+CURSOR_ROUTES = ['/news', '/profile/2', '/post/2/comments', '/admin/api/posts']
+MALFORMED_CURSORS = [["2020-01-01", [1]], ["2020-01-01", {"id": 1}], ["2020-01-01", None],
+                     ["2020-01-01", True], ["2020-01-01", "1"], [1, 1], ["not a date", 1], "", "%%%"]
+
+def cursor_token(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+# Lookup tables small enough to be read whole (into a process cache)
+LOOKUP_TABLES = {'category'}
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY)')
+ORDERED_LIMIT = re.compile(r'\bORDER BY\b.*\bLIMIT\b', re.IGNORECASE | re.DOTALL)
+
+def capture_statements(client, requests):
+    """Drive ``requests`` and return the distinct statements they executed"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and (statement, parameters) not in statements:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        for method, path, data in requests:
+            client.open(path, method=method, data=data)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return statements
+
+def plan_problems(statement, parameters, tables):
+    """Return the EXPLAIN QUERY PLAN lines that indicate a scan or sort"""
+    if not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+        return []
+    with db.engine.connect() as connection:
+        plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    details = [row[-1] for row in plan]
+    sorts = [detail for detail in details if TEMP_SORT.search(detail)]
+    scans = [detail for detail in details
+             if FULL_SCAN.match(detail) and FULL_SCAN.match(detail).group(1) in tables]
+    # A bare SCAN walks the rowid; with ORDER BY ... LIMIT and no sort the
+    # ORDER BY is that rowid order, so the scan stops after one page. A LIMIT
+    # alone (e.g. .first() on an unindexed filter) may still read every row
+    if scans and not sorts and ORDERED_LIMIT.search(statement):
+        scans = []
+    # Relevance ranking has to score every full-text match, so sorting the
+    # matches is inherent; the match itself comes from the FTS index
+    if any('VIRTUAL TABLE' in detail for detail in details):
+        sorts = []
+    return scans + sorts
+
+def main():
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_db.insert_sample_data()
+        # No ANALYZE: without statistics the planner assumes large tables,
+        # which is what production looks like, rather than the seed's 15 rows
+        tables = set(db.metadata.tables) - LOOKUP_TABLES
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+    failures = 0
+    print("\n" + "="*60)
+    print("🔎 CHECKING QUERY PLANS")
+    print("="*60 + "\n")
+    for route, requests in ROUTES.items():
+        with app.app_context():
+            route_client = app.test_client() if route == 'login' else client
+            statements = capture_statements(route_client, requests)
+            route_failures = []
+            for statement, parameters in statements:
+                problems = plan_problems(statement, parameters, tables)
+                if problems:
+                    route_failures.append((statement, problems))
+
+        if route_failures:
+            failures += len(route_failures)
+            print(f"❌ {route}: {len(route_failures)} of {len(statements)} statements scan or sort")
+            for statement, problems in route_failures:
+                print(f"    {' '.join(statement.split())[:160]}")
+                for problem in problems:
+                    print(f"      → {problem}")
+        else:
+            print(f"✅ {route}: {len(statements)} statements, all indexed")
+
+    cursor_failures = []
+    for path in CURSOR_ROUTES:
+        for payload in MALFORMED_CURSORS:
+            token = payload if payload in ('', '%%%') else cursor_token(payload)
+            try:
+                status = client.get(f'{path}?after={token}').status_code
+            except Exception as e:
+                status = type(e).__name__
+            if status != 200:
+                cursor_failures.append(f"{path}?after={json.dumps(payload)} → {status}")
+    if cursor_failures:
+        print(f"❌ malformed cursors: {len(cursor_failures)} requests failed")
+        for failure in cursor_failures:
+            print(f"    {failure}")
+    else:
+        print(f"✅ malformed cursors: {len(CURSOR_ROUTES) * len(MALFORMED_CURSORS)} requests ignored them")
+
+    print()
+    if failures or cursor_failures:
+        print(f"❌ {failures} statements fell back to a full scan or temp sort, "
+              f"{len(cursor_failures)} malformed cursors failed")
+        return 1
+    print("🎉 Every route query is served by an index!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
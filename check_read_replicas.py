@@ -0,0 +1,118 @@
+"""
+Check read-replica routing with two local SQLite files
+Seeds a primary database and copies it to a "replica" that never receives
+later writes, which behaves like a lagging replica. Then checks that:
+  - anonymous GETs of read routes are answered from the replica
+  - write routes go to the primary
+  - a user who just commented reads from the primary (sees their comment)
+    until REPLICA_STICKY_SECONDS have passed
+  - the process-wide category cache is filled from the primary, even when
+    a replica-routed page triggers the load
+  - pages stored in the page cache are rendered from the primary, so one
+    rendered right after an invalidating write is not stale
+Usage: python check_read_replicas.py
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+DIRECTORY = tempfile.mkdtemp()
+PRIMARY = os.path.join(DIRECTORY, 'primary.db')
+REPLICA = os.path.join(DIRECTORY, 'replica.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{PRIMARY}'
+os.environ['DATABASE_REPLICA_URLS'] = f'sqlite:///{REPLICA}'
+os.environ['REPLICA_STICKY_SECONDS'] = '2'
+os.environ['PAGE_CACHE_BACKEND'] = 'none'
+
+from app import app, db, category_cache, page_cache
+from database import routing_stats
+from categories import ensure_categories
+from page_cache import MemoryCache
+import create_db
+
+COMMENT = 'Read-your-writes check comment'
+CATEGORY = 'Replica lag check'
+CACHED_COMMENT = 'Page cache check comment'
+
+def check(label, condition):
+    print(f"{'✅' if condition else '❌'} {label}")
+    return bool(condition)
+
+def statements(action):
+    """Run ``action`` and return how many statements went to each database"""
+    before = dict(routing_stats.counts)
+    action()
+    return {name: count - before.get(name, 0) for name, count in routing_stats.counts.items()
+            if count != before.get(name, 0)}
+
+def main():
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_db.insert_sample_data()
+        db.session.remove()
+        db.engine.dispose()
+    shutil.copyfile(PRIMARY, REPLICA)
+
+    print("\n" + "="*60)
+    print("🔀 CHECKING READ REPLICA ROUTING")
+    print("="*60 + "\n")
+
+    ok = True
+    anonymous = app.test_client()
+    user = app.test_client()
+
+    # The first page also fills the category cache, from the primary
+    used = statements(lambda: anonymous.get('/news'))
+    ok &= check(f"a cold category cache loads from the primary {used}", 'primary' in used)
+    used = statements(lambda: anonymous.get('/news'))
+    ok &= check(f"anonymous /news reads from the replica {used}", set(used) == {'replica_0'})
+
+    user.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    used = statements(lambda: user.post('/post/2/comment', data={'content': COMMENT}))
+    ok &= check(f"adding a comment writes to the primary {used}", set(used) == {'primary'})
+
+    page = {}
+    used = statements(lambda: page.update(user=user.get('/post/2').get_data(as_text=True)))
+    ok &= check(f"the commenter's next page reads from the primary {used}", set(used) == {'primary'})
+    ok &= check("the commenter sees their own comment", COMMENT in page['user'])
+
+    page['anonymous'] = anonymous.get('/post/2').get_data(as_text=True)
+    ok &= check("other visitors still read the (lagging) replica", COMMENT not in page['anonymous'])
+
+    time.sleep(app.config['REPLICA_STICKY_SECONDS'] + 0.5)
+    used = statements(lambda: user.get('/post/2'))
+    ok &= check(f"after the sticky window the commenter is back on the replica {used}",
+                set(used) == {'replica_0'})
+
+    with app.app_context():
+        ensure_categories(db.session, [CATEGORY])
+        db.session.commit()
+    page['categories'] = anonymous.get('/news').get_data(as_text=True)
+    ok &= check("a category added on the primary shows up on replica-routed pages", CATEGORY in page['categories'])
+
+    used = statements(lambda: user.get('/admin'))
+    ok &= check(f"admin pages always read the primary {used}", set(used) == {'primary'})
+
+    page_cache.backend = MemoryCache()
+    user.post('/post/2/comment', data={'content': CACHED_COMMENT})
+    used = statements(lambda: page.update(cached=anonymous.get('/post/2').get_data(as_text=True)))
+    ok &= check(f"a page cache miss renders from the primary {used}", set(used) == {'primary'})
+    page['cached'] = anonymous.get('/post/2').get_data(as_text=True)
+    ok &= check("the cached page includes the comment the replica has not seen", CACHED_COMMENT in page['cached'])
+
+    print()
+    if not ok:
+        print("❌ Replica routing check failed")
+        return 1
+    print("🎉 Replica routing works!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Check the configured upload storage backend end to end
+Runs put/get/stream/exists/url/delete against whatever STORAGE_BACKEND
+points at, and fetches the URL it hands out the way a browser would.
+--create-bucket creates a missing bucket with uploads publicly readable.
+To try the S3 backend locally, run an S3 stand-in such as MinIO or
+`moto_server -p 9000` and point the app at it:
+  STORAGE_BACKEND=s3 S3_BUCKET=student-news S3_ENDPOINT_URL=http://localhost:9000 \
+  S3_PUBLIC_URL=http://localhost:9000/student-news \
+  AWS_ACCESS_KEY_ID=test AWS_SECRET_ACCESS_KEY=test S3_REGION=us-east-1 \
+  python check_storage.py --create-bucket
+Usage: python check_storage.py [--create-bucket]
+"""
+import hashlib
+import io
+import json
+import sys
+import urllib.error
+import urllib.request
+from app import app
+from storage import S3Storage
+
+NAME = 'storage-check-' + hashlib.sha256(b'storage-check').hexdigest()[:12] + '.txt'
+DATA = b'Student News storage check\n' * 4096
+
+def check(label, condition):
+    print(f"{'✅' if condition else '❌'} {label}")
+    return bool(condition)
+
+def fetch(url):
+    if url.startswith('/'):
+        # Local URLs are served by this app's static route
+        response = app.test_client().get(url)
+        return response.status_code, response.data
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, b''
+
+def main():
+    storage = app.extensions['storage']
+    print("\n" + "="*60)
+    print(f"🗄️  CHECKING {type(storage).__name__.upper()}")
+    print("="*60 + "\n")
+
+    if '--create-bucket' in sys.argv and isinstance(storage, S3Storage):
+        existing = [bucket['Name'] for bucket in storage.client.list_buckets().get('Buckets', [])]
+        if storage.bucket not in existing:
+            storage.client.create_bucket(Bucket=storage.bucket)
+            # Pages link straight to S3_PUBLIC_URL, so uploads must be publicly readable
+            storage.client.put_bucket_policy(Bucket=storage.bucket, Policy=json.dumps({
+                'Version': '2012-10-17',
+                'Statement': [{'Effect': 'Allow', 'Principal': '*', 'Action': 's3:GetObject',
+                               'Resource': f'arn:aws:s3:::{storage.bucket}/{storage.prefix}*'}],
+            }))
+            print(f"📦 Created bucket {storage.bucket}, publicly readable under {storage.prefix}")
+
+    ok = True
+    with app.test_request_context():
+        storage.put(NAME, io.BytesIO(DATA), 'text/plain')
+        ok &= check("put then exists", storage.exists(NAME))
+        ok &= check("get returns the same bytes", storage.get(NAME) == DATA)
+        chunks = list(storage.stream(NAME, chunk_size=16 * 1024))
+        ok &= check(f"stream returns the same bytes in {len(chunks)} chunks", b''.join(chunks) == DATA)
+
+        url = storage.url(NAME)
+        status, body = fetch(url)
+        ok &= check(f"url serves the file directly ({url[:60]}...)", status == 200 and body == DATA)
+        ok &= check("url is the same every time, so pages and browsers can cache it", storage.url(NAME) == url)
+        if isinstance(storage, S3Storage):
+            status, body = fetch(storage.presigned_url(NAME, expires=60))
+            ok &= check("presigned_url serves the file", status == 200 and body == DATA)
+
+        storage.put(NAME, io.BytesIO(b'replaced'), 'text/plain')
+        ok &= check("put replaces an existing file", storage.get(NAME) == b'replaced')
+
+        storage.delete(NAME)
+        ok &= check("delete removes the file", not storage.exists(NAME))
+        storage.delete(NAME)
+        ok &= check("deleting a missing file is a no-op", True)
+
+    print()
+    if not ok:
+        print("❌ Storage backend check failed")
+        return 1
+    print("🎉 Storage backend works!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,7 @@ Create and populate SQLite database with professional sample data
 """
 from app import app, db
 from models import User, Post, Comment, Share
+from categories import DEFAULT_CATEGORIES, ensure_categories
 from werkzeug.security import generate_password_hash
 
 def create_database():
@@ -152,12 +153,15 @@ def insert_sample_data():
         },
     ]
     
+    # The standard categories first, then any extra ones the sample posts use
+    categories = ensure_categories(db.session, DEFAULT_CATEGORIES + [post_data['category'] for post_data in posts_data])
+    
     posts = []
     for post_data in posts_data:
         post = Post(
             title=post_data['title'],
             content=post_data['content'],
-            category=post_data['category'],
+            category=categories[post_data['category']],
             author=post_data['author']
         )
         db.session.add(post)
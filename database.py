@@ -0,0 +1,165 @@
+"""
+Database configuration from the environment
+DATABASE_URL picks the primary database and DATABASE_REPLICA_URLS
+(comma-separated) adds read replicas. Pool settings come from DB_POOL_*.
+Read-only GET routes are sent to a replica; everything else, and every
+request from a user who wrote within REPLICA_STICKY_SECONDS, stays on the
+primary so people always see their own comments and posts.
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, TextClause
+from sqlalchemy.engine import make_url
+
+DEFAULT_DATABASE_URL = 'sqlite:///student_news.db'
+
+# Flask session key holding the time until which this user reads from the primary
+STICKY_KEY = '_db_primary_until'
+
+def database_url():
+    return os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+
+def replica_urls():
+    return [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    return default if value is None else value.lower() in ('1', 'true', 'yes', 'on')
+
+def engine_options(url):
+    """Pool settings for ``url`` from DB_POOL_SIZE/_MAX_OVERFLOW/_TIMEOUT/_RECYCLE/_PRE_PING"""
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # In-memory SQLite lives in a single connection; there is nothing to pool
+        return {}
+    server = url.get_backend_name() != 'sqlite'
+    return {
+        'pool_size': _env_int('DB_POOL_SIZE', 10),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        # MySQL drops idle connections after wait_timeout (8h by default)
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800 if server else -1),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', server),
+    }
+
+def mysql_connect_kwargs(include_database=True):
+    """
+    mysql.connector.connect() arguments for the standalone MySQL scripts,
+    taken from a mysql DATABASE_URL or from MYSQL_HOST/PORT/USER/PASSWORD/DATABASE
+    """
+    url = make_url(database_url())
+    if url.get_backend_name() == 'mysql':
+        kwargs = {'host': url.host or 'localhost', 'port': url.port or 3306,
+                  'user': url.username or 'root', 'password': url.password or '',
+                  'database': url.database or 'student_news'}
+    else:
+        kwargs = {'host': os.environ.get('MYSQL_HOST', 'localhost'),
+                  'port': _env_int('MYSQL_PORT', 3306),
+                  'user': os.environ.get('MYSQL_USER', 'root'),
+                  'password': os.environ.get('MYSQL_PASSWORD', ''),
+                  'database': os.environ.get('MYSQL_DATABASE', 'student_news')}
+    if not include_database:
+        kwargs.pop('database')
+    return kwargs
+
+class RoutingStats:
+    """How many statements went to the primary and to the replicas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def bump(self, name):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+routing_stats = RoutingStats()
+
+def _is_read(clause):
+    if isinstance(clause, Select):
+        return True
+    return isinstance(clause, TextClause) and clause.text.lstrip().upper().startswith('SELECT')
+
+class RoutingSession(Session):
+    """Sends the reads of replica-routed requests to the replica picked for the request"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = g.get('db_replica') if has_request_context() else None
+        if replica and bind is None and not self._flushing and _is_read(clause):
+            routing_stats.bump(replica)
+            return self._db.engines[replica]
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        routing_stats.bump('primary')
+        return engine
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, even in a replica-routed request;
+    for process-wide caches, which a lagging replica must not fill"""
+    if not has_request_context():
+        yield
+        return
+    replica = g.get('db_replica')
+    g.db_replica = None
+    try:
+        yield
+    finally:
+        g.db_replica = replica
+
+def replica_binds(urls=None):
+    """SQLALCHEMY_BINDS entries for the replicas: replica_0, replica_1, ..."""
+    urls = replica_urls() if urls is None else urls
+    return {f'replica_{index}': url for index, url in enumerate(urls)}
+
+def note_write(db_session):
+    """Mark the session's transaction as a write; Core statements outside the
+    unit of work call this so the commit still keeps the user on the primary"""
+    db_session.info['wrote'] = True
+
+def init_app(app, db):
+    """Route read-only requests to replicas and keep writers on the primary"""
+    replicas = [key for key in app.config.get('SQLALCHEMY_BINDS', {}) if key.startswith('replica_')]
+    read_endpoints = app.config.get('REPLICA_READ_ENDPOINTS', set())
+    sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 10)
+
+    @app.before_request
+    def _choose_database():
+        g.db_replica = None
+        if (replicas and request.method in ('GET', 'HEAD') and request.endpoint in read_endpoints
+                and session.get(STICKY_KEY, 0) < time.time()):
+            g.db_replica = random.choice(replicas)
+
+    @db.event.listens_for(db.session, 'after_flush')
+    def _note_write(db_session, flush_context):
+        note_write(db_session)
+
+    @db.event.listens_for(db.session, 'after_commit')
+    def _stick_to_primary(db_session):
+        # Replicas may lag; read this user's next pages from the primary
+        if db_session.info.pop('wrote', False) and replicas and has_request_context():
+            session[STICKY_KEY] = time.time() + sticky_seconds
+
+    @db.event.listens_for(db.session, 'after_soft_rollback')
+    def _forget_write(db_session, previous_transaction):
+        db_session.info.pop('wrote', None)
+
+def pool_stats(db):
+    """Connection pool and routing numbers for every engine"""
+    engines = {}
+    for key, engine in db.engines.items():
+        pool = engine.pool
+        entry = {'url': engine.url.render_as_string(hide_password=True), 'pool': type(pool).__name__}
+        for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+            method = getattr(pool, name, None)
+            if callable(method):
+                entry[name] = method()
+        engines[key or 'primary'] = entry
+    return {'engines': engines, 'statements': dict(routing_stats.counts)}
@@ -0,0 +1,132 @@
+"""
+Move existing uploads to content-addressed storage
+Hashes every image a post points at, renames it (and its variants) to
+<sha256>.<ext>, repoints the posts, drops byte-identical duplicates and
+recomputes Upload.ref_count. Safe to re-run; run it while nobody is posting,
+since the recount overwrites counts that new posts are changing.
+Works through the configured storage backend.
+Usage: python dedupe_uploads.py [--prune]
+  --prune  also delete files in the local upload folder that nothing uses.
+           Like sweep_uploads.py it only removes uploads unused for
+           UPLOAD_SWEEP_GRACE, and it never touches staging (.part) files or
+           files newer than that, which may be uploads still in progress.
+"""
+import hashlib
+import io
+import os
+import sys
+import time
+from datetime import datetime
+from sqlalchemy import func, select
+from app import app, db
+from models import Post, Upload, insert_ignore
+from images import variant_filenames
+from uploads import sweep_uploads
+
+PRUNE = '--prune' in sys.argv
+CHUNK_SIZE = 64 * 1024
+
+def stored_sha256(storage, name):
+    """(sha256, size) of a stored file, read in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in storage.stream(name, CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+def move_file(storage, old, new):
+    """Rename old -> new, or just drop old when new is already there"""
+    if old == new or not storage.exists(old):
+        return
+    if not storage.exists(new):
+        storage.put(new, io.BytesIO(storage.get(old)))
+    storage.delete(old)
+
+def adopt_files(storage):
+    """Give every referenced image its content-hash name and an Upload row"""
+    filenames = [name for name, in db.session.query(Post.image_filename)
+                 .filter(Post.image_filename.isnot(None)).distinct()]
+    moved = duplicates = 0
+    for filename in filenames:
+        if not storage.exists(filename):
+            print(f"  ⚠️  {filename} is missing, skipped")
+            continue
+        sha256, size = stored_sha256(storage, filename)
+        upload = Upload.query.filter_by(sha256=sha256).first()
+        target = upload.filename if upload else f"{sha256}.{filename.rsplit('.', 1)[-1].lower()}"
+        if target != filename:
+            if storage.exists(target):
+                duplicates += 1
+            # Variants keep their suffixes; drop them if the target has its own
+            for old_variant, new_variant in zip(variant_filenames(filename), variant_filenames(target)):
+                move_file(storage, old_variant, new_variant)
+            move_file(storage, filename, target)
+            moved += 1
+        if upload is None:
+            # The variants were renamed along with the file, so they still apply
+            variants = db.session.query(func.max(Post.image_variants)).filter(Post.image_filename == filename).scalar()
+            insert_ignore(db.session.connection(), Upload.__table__, sha256=sha256, filename=target,
+                          size=size, ref_count=0, variants=variants)
+        else:
+            variants = upload.variants
+        if target != filename:
+            Post.query.filter_by(image_filename=filename).update(
+                {'image_filename': target, 'image_variants': variants}, synchronize_session=False)
+        db.session.commit()
+    print(f"✅ {len(filenames)} images checked, {moved} renamed, {duplicates} duplicates removed")
+
+def recount_references():
+    """Set ref_count from the posts table, replacing whatever drifted"""
+    upload_table = Upload.__table__
+    references = (select(func.count(Post.id))
+                  .where(Post.image_filename == upload_table.c.filename).scalar_subquery())
+    db.session.execute(upload_table.update().values(ref_count=references))
+    # Unused uploads start their sweep grace period now (see sweep_uploads.py)
+    db.session.execute(upload_table.update().where(upload_table.c.ref_count > 0).values(released_at=None))
+    db.session.execute(upload_table.update()
+                       .where(upload_table.c.ref_count == 0, upload_table.c.released_at.is_(None))
+                       .values(released_at=datetime.utcnow()))
+    db.session.commit()
+    unused = Upload.query.filter(Upload.ref_count == 0).count()
+    print(f"✅ Reference counts recomputed ({unused} unused uploads)")
+
+def prune(storage, folder, grace):
+    """
+    Sweep uploads unused for ``grace`` seconds, then delete files older than
+    that which no Upload row, post or variant accounts for
+    """
+    swept = sweep_uploads(storage, grace)
+    keep = set()
+    for filename, in db.session.query(Upload.filename).union(db.session.query(Post.image_filename)):
+        if filename:
+            keep.add(filename)
+            keep.update(variant_filenames(filename))
+    db.session.commit()
+    cutoff = time.time() - grace
+    removed = 0
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        # Staging files and recent files may belong to an upload whose row is not committed yet
+        if name in keep or name.endswith('.part') or not os.path.isfile(path):
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    print(f"✅ Swept {swept} unused uploads, pruned {removed} unreferenced files")
+
+if __name__ == '__main__':
+    try:
+        with app.app_context():
+            adopt_files(app.extensions['storage'])
+            recount_references()
+            if PRUNE:
+                prune(app.extensions['storage'], app.config['UPLOAD_FOLDER'], app.config['UPLOAD_SWEEP_GRACE'])
+        print("\n🎉 Upload deduplication complete!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        print("Please run migrate_schema.py first if the upload table is missing.")
+        sys.exit(1)
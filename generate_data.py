@@ -0,0 +1,236 @@
+"""
+Generate a large synthetic dataset for load testing
+Writes users, posts, comments and shares with executemany inserts in
+chunked transactions, so millions of rows load in minutes on SQLite or
+MySQL. The password is hashed once and shared by every generated user.
+The same --seed always produces the same rows (only the password salt
+differs), so benchmarks can use the result as a fixture. Post counters,
+category post counts and last_activity_at are filled in directly;
+backfill_counts.py is not needed. Posts go into the standard categories,
+which are created if missing.
+
+Distributions for --comments/--shares (per post):
+  fixed:N        exactly N
+  uniform:A-B    anywhere from A to B
+  poisson:MEAN   around MEAN
+  exp:MEAN       long tail: most posts get few, a handful get many
+
+Generated users are user<ID> with password 'password123'; the first
+--admins of them are admins.
+Usage: python generate_data.py [--users N] [--posts N] [--comments DIST]
+       [--shares DIST] [--seed N] [--days N] [--chunk N] [--reset]
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from werkzeug.security import generate_password_hash
+
+PASSWORD = 'password123'
+
+WORDS = (
+    'campus student library exam semester club team match concert lecture professor research '
+    'festival volunteer scholarship workshop seminar deadline project lab cafeteria dorm hall '
+    'coach season final victory debate theatre gallery robotics coding hackathon startup career '
+    'fair alumni graduation orientation week weekend evening morning new annual open free local '
+    'record award grant study group session update schedule change policy board council vote '
+    'election survey feedback community garden sustainability energy music art photo film'
+).split()
+
+TITLE_TEMPLATES = [
+    '{0} {1} announced for {2} week',
+    'Students organise {0} {1}',
+    '{0} team wins {1} {2}',
+    'New {0} {1} opens on campus',
+    'What to know about the {0} {1}',
+    '{0} and {1}: a {2} update',
+]
+
+def parse_distribution(spec):
+    """Turn 'fixed:N', 'uniform:A-B', 'poisson:MEAN' or 'exp:MEAN' into ``draw(rng) -> int``"""
+    kind, _, value = spec.partition(':')
+    try:
+        if kind == 'fixed':
+            count = int(value)
+            return lambda rng: count
+        if kind == 'uniform':
+            low, _, high = value.partition('-')
+            low, high = int(low), int(high or low)
+            return lambda rng: rng.randint(low, high)
+        if kind == 'poisson':
+            mean = float(value)
+            return lambda rng: _poisson(rng, mean)
+        if kind == 'exp':
+            mean = float(value)
+            return lambda rng: int(rng.expovariate(1 / mean)) if mean > 0 else 0
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"bad distribution {spec!r}; use fixed:N, uniform:A-B, poisson:MEAN or exp:MEAN")
+
+def _poisson(rng, mean):
+    if mean <= 0:
+        return 0
+    if mean > 30:
+        # Normal approximation; Knuth's method gets slow for large means
+        return max(0, round(rng.gauss(mean, math.sqrt(mean))))
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+def _title(rng):
+    return rng.choice(TITLE_TEMPLATES).format(*(rng.choice(WORDS) for _ in range(3))).capitalize()
+
+def _content(rng):
+    return '\n\n'.join(' '.join(_sentence(rng, rng.randint(8, 16)) for _ in range(rng.randint(2, 4)))
+                       for _ in range(rng.randint(2, 4)))
+
+def _insert(connection, table, rows, batch):
+    for start in range(0, len(rows), batch):
+        connection.execute(table.insert(), rows[start:start + batch])
+
+def generate(engine, users=1000, posts=10000, comments='exp:5', shares='exp:2', seed=42,
+             days=365, chunk=5000, admins=1, now=None, log=print):
+    """
+    Append a synthetic dataset to the database behind ``engine``
+    ``comments``/``shares`` are distribution specs (see parse_distribution).
+    Returns the number of rows written per table.
+    """
+    from models import User, Post, Comment, Share, Category
+    from categories import DEFAULT_CATEGORIES
+    user_table, post_table, category_table = User.__table__, Post.__table__, Category.__table__
+    comment_table, share_table = Comment.__table__, Share.__table__
+    draw_comments = parse_distribution(comments) if isinstance(comments, str) else comments
+    draw_shares = parse_distribution(shares) if isinstance(shares, str) else shares
+    rng = random.Random(seed)
+    # Midnight keeps timestamps identical for every run on the same day
+    now = now or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    span = days * 86400
+    password_hash = generate_password_hash(PASSWORD)
+    written = {'users': 0, 'posts': 0, 'comments': 0, 'shares': 0}
+
+    with engine.begin() as connection:
+        existing = set(connection.scalars(select(category_table.c.name)))
+        missing = [{'name': name} for name in DEFAULT_CATEGORIES if name not in existing]
+        if missing:
+            connection.execute(category_table.insert(), missing)
+        category_ids = dict(connection.execute(
+            select(category_table.c.name, category_table.c.id).where(category_table.c.name.in_(DEFAULT_CATEGORIES))
+        ).all())
+        category_ids = [category_ids[name] for name in DEFAULT_CATEGORIES]
+        first_user = (connection.scalar(select(func.max(user_table.c.id))) or 0) + 1
+        first_post = (connection.scalar(select(func.max(post_table.c.id))) or 0) + 1
+    user_ids = range(first_user, first_user + users)
+
+    started = time.perf_counter()
+    for start in range(0, users, chunk):
+        rows = []
+        for user_id in user_ids[start:start + chunk]:
+            rows.append({'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@student.edu',
+                         'password_hash': password_hash, 'is_admin': user_id - first_user < admins,
+                         'created_at': now - timedelta(seconds=rng.randrange(span))})
+        with engine.begin() as connection:
+            _insert(connection, user_table, rows, chunk)
+        written['users'] += len(rows)
+    log(f"  • {written['users']:,} users")
+
+    # Rebuilding the SQLite search index once is far cheaper than a trigger per row
+    fts_trigger = engine.dialect.name == 'sqlite' and posts > 0
+    if fts_trigger:
+        with engine.begin() as connection:
+            connection.exec_driver_sql("DROP TRIGGER IF EXISTS post_fts_insert")
+
+    try:
+        for start in range(0, posts, chunk):
+            post_rows, comment_rows, share_rows = [], [], []
+            category_counts = {}
+            for post_id in range(first_post + start, first_post + min(start + chunk, posts)):
+                created = now - timedelta(seconds=rng.randrange(span))
+                age = max(1, int((now - created).total_seconds()))
+                last_activity = created
+                comment_total = draw_comments(rng)
+                for _ in range(comment_total):
+                    at = created + timedelta(seconds=rng.randrange(age))
+                    last_activity = max(last_activity, at)
+                    comment_rows.append({'content': _sentence(rng, rng.randint(4, 20)),
+                                         'author_id': rng.choice(user_ids), 'post_id': post_id,
+                                         'created_at': at})
+                sharers = rng.sample(user_ids, min(draw_shares(rng), len(user_ids)))
+                for user_id in sharers:
+                    at = created + timedelta(seconds=rng.randrange(age))
+                    last_activity = max(last_activity, at)
+                    share_rows.append({'user_id': user_id, 'post_id': post_id, 'created_at': at})
+                category_id = rng.choice(category_ids)
+                category_counts[category_id] = category_counts.get(category_id, 0) + 1
+                post_rows.append({'id': post_id, 'title': _title(rng), 'content': _content(rng),
+                                  'category_id': category_id, 'author_id': rng.choice(user_ids),
+                                  'created_at': created, 'updated_at': created,
+                                  'last_activity_at': last_activity,
+                                  'comment_count': comment_total, 'share_count': len(sharers)})
+            with engine.begin() as connection:
+                _insert(connection, post_table, post_rows, chunk)
+                _insert(connection, comment_table, comment_rows, chunk)
+                _insert(connection, share_table, share_rows, chunk)
+                for category_id, count in category_counts.items():
+                    connection.execute(category_table.update().where(category_table.c.id == category_id)
+                                       .values(post_count=category_table.c.post_count + count))
+            written['posts'] += len(post_rows)
+            written['comments'] += len(comment_rows)
+            written['shares'] += len(share_rows)
+            rate = sum(written.values()) / (time.perf_counter() - started)
+            log(f"  • {written['posts']:,}/{posts:,} posts, {written['comments']:,} comments, "
+                f"{written['shares']:,} shares ({rate:,.0f} rows/s)")
+    finally:
+        if fts_trigger:
+            from search import install_search_index
+            log("  • Rebuilding the search index...")
+            with engine.begin() as connection:
+                install_search_index(connection)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset for load testing")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--comments', type=parse_distribution, default='exp:5', help="comments per post")
+    parser.add_argument('--shares', type=parse_distribution, default='exp:2', help="shares per post")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--days', type=int, default=365, help="spread posts over this many days")
+    parser.add_argument('--chunk', type=int, default=5000, help="rows per transaction")
+    parser.add_argument('--admins', type=int, default=1)
+    parser.add_argument('--reset', action='store_true', help="drop and recreate every table first")
+    args = parser.parse_args()
+
+    from app import app, db
+    with app.app_context():
+        print("\n" + "="*60)
+        print("🏭 GENERATING SYNTHETIC DATA")
+        print("="*60 + "\n")
+        print(f"💾 Database: {db.engine.url.render_as_string(hide_password=True)}")
+        if args.reset:
+            print("📋 Recreating tables...")
+            db.drop_all()
+            db.create_all()
+
+        started = time.perf_counter()
+        written = generate(db.engine, users=args.users, posts=args.posts, comments=args.comments,
+                           shares=args.shares, seed=args.seed, days=args.days, chunk=args.chunk,
+                           admins=args.admins)
+        elapsed = time.perf_counter() - started
+        total = sum(written.values())
+        print(f"\n✅ Wrote {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+        print(f"🔑 Log in as user<ID> with password '{PASSWORD}'")
+        print("\n🎉 Dataset ready!")
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
@@ -0,0 +1,126 @@
+"""
+Resized WebP/JPEG derivatives of uploaded post images
+Uploads are stored untouched; a small worker pool then writes card, medium
+and full variants next to them so listing pages never ship the original.
+Pillow is optional: without it the original is served as before.
+"""
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> maximum width in pixels, smallest first
+VARIANTS = {'card': 480, 'medium': 960, 'full': 1600}
+
+# Extension -> (Pillow format, mime type, save options)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+def variant_filename(filename, variant, ext):
+    """e.g. ('abc.png', 'card', 'webp') -> 'abc_card.webp'"""
+    return f"{filename.rsplit('.', 1)[0]}_{variant}.{ext}"
+
+def variant_filenames(filename, variants=VARIANTS):
+    return [variant_filename(filename, variant, ext) for variant in variants for ext in FORMATS]
+
+def generate_variants(storage, filename):
+    """
+    Write every variant of ``filename`` to ``storage`` and return the variant
+    names created. Images are never upscaled: a variant is only produced when
+    the original is wider than the previous, smaller one.
+    """
+    with Image.open(io.BytesIO(storage.get(filename))) as original:
+        original = ImageOps.exif_transpose(original)
+        # Animated GIFs keep their first frame; JPEG cannot hold alpha
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'A' in original.getbands() or 'transparency' in original.info else 'RGB')
+
+        created = []
+        previous_width = 0
+        for variant, width in VARIANTS.items():
+            if created and original.width <= previous_width:
+                break
+            resized = original.copy()
+            resized.thumbnail((width, width * 4), Image.LANCZOS)
+            for ext, (fmt, mime, options) in FORMATS.items():
+                image = resized.convert('RGB') if fmt == 'JPEG' else resized
+                buffer = io.BytesIO()
+                image.save(buffer, fmt, **options)
+                buffer.seek(0)
+                storage.put(variant_filename(filename, variant, ext), buffer, mime)
+            created.append(variant)
+            previous_width = width
+    return created
+
+def remove_variants(storage, filename):
+    for name in variant_filenames(filename):
+        storage.delete(name)
+
+def srcset(filename, variants, ext, url_for_upload):
+    """Build a srcset attribute value from the recorded variant names"""
+    return ', '.join(
+        f"{url_for_upload(variant_filename(filename, variant, ext))} {VARIANTS[variant]}w"
+        for variant in variants if variant in VARIANTS
+    )
+
+class ImagePipeline:
+    """Runs generate_variants off the request thread and records the result"""
+
+    def __init__(self, app=None, on_ready=None):
+        self.executor = None
+        self.on_ready = on_ready
+        if app is not None:
+            self.init_app(app)
+
+    @property
+    def available(self):
+        return Image is not None and self.executor is not None
+
+    def init_app(self, app):
+        self.app = app
+        workers = app.config.get('IMAGE_WORKERS', 2)
+        if Image is None:
+            logger.warning("Pillow is not installed; image variants are disabled")
+        elif workers:
+            # Pillow releases the GIL while resizing and encoding, so threads scale
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variants')
+
+    def submit(self, post_id, filename):
+        """Queue variant generation for a freshly saved upload"""
+        if self.available:
+            return self.executor.submit(self._process, post_id, filename)
+        return None
+
+    def _process(self, post_id, filename):
+        from models import db, Post, Upload
+        try:
+            variants = generate_variants(self.app.extensions['storage'], filename)
+        except Exception:
+            logger.exception("Could not generate variants for %s", filename)
+            return []
+
+        with self.app.app_context():
+            # Only record variants if the post still uses this image
+            result = db.session.execute(
+                Post.__table__.update()
+                .where(Post.__table__.c.id == post_id, Post.__table__.c.image_filename == filename)
+                .values(image_variants=','.join(variants))
+            )
+            # Later posts reusing the same upload pick the variants up from here
+            db.session.execute(
+                Upload.__table__.update()
+                .where(Upload.__table__.c.filename == filename)
+                .values(variants=','.join(variants))
+            )
+            db.session.commit()
+        if result.rowcount and self.on_ready:
+            self.on_ready(post_id)
+        return variants
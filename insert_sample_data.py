@@ -3,16 +3,12 @@ from mysql.connector import Error
 from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
 import random
+from database import mysql_connect_kwargs
 
 def insert_sample_data():
     """Insert rich sample data for a professional-looking database"""
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='student_news',
-            user='root',
-            password='root'
-        )
+        connection = mysql.connector.connect(**mysql_connect_kwargs())
         
         cursor = connection.cursor()
         
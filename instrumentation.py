@@ -0,0 +1,210 @@
+"""
+Per-request performance instrumentation
+SQLAlchemy cursor events and Flask's template signals add up, per request,
+the number of SQL statements, time spent in SQL, the slowest statement,
+template render time and total time. Each response carries them in a
+Server-Timing header, each request is logged as one JSON line, and
+per-endpoint histograms are kept for the Prometheus /metrics endpoint.
+Everything is a few perf_counter() calls and dict updates, cheap enough to
+leave on. Histograms are per process; with several workers, scrape each.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from flask import current_app, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+# Slowest statements are logged, truncated to this many characters
+STATEMENT_PREVIEW = 200
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by label values"""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [count per bucket..., +Inf count, sum]
+
+    def observe(self, label_values, value):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+class Counter:
+    """Prometheus-style counter keyed by label values"""
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._series = {}
+
+    def inc(self, label_values, amount=1):
+        self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._series.items()):
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class RequestTimings:
+    """What one request spent its time on"""
+    __slots__ = ('started', 'statements', 'sql_seconds', 'slowest_seconds', 'slowest_statement',
+                 'render_seconds', '_render_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+        self.render_seconds = 0.0
+        self._render_started = None
+
+class RequestMetrics:
+    """Flask glue: times every request and serves the histograms at /metrics"""
+
+    def __init__(self, app=None, db=None):
+        self._lock = threading.Lock()
+        self.requests = Counter('student_news_requests_total', "Requests handled", ('endpoint', 'status'))
+        self.duration = Histogram('student_news_request_duration_seconds', "Total request time",
+                                  ('endpoint',), SECONDS_BUCKETS)
+        self.sql_duration = Histogram('student_news_request_sql_seconds', "Time spent in SQL per request",
+                                      ('endpoint',), SECONDS_BUCKETS)
+        self.render_duration = Histogram('student_news_request_render_seconds',
+                                         "Time spent rendering templates per request",
+                                         ('endpoint',), SECONDS_BUCKETS)
+        self.statements = Histogram('student_news_request_sql_statements', "SQL statements per request",
+                                    ('endpoint',), STATEMENT_BUCKETS)
+        self.server_timing = True
+        self.log_requests = True
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.server_timing = app.config.get('SERVER_TIMING', True)
+        self.log_requests = app.config.get('REQUEST_LOG', True)
+        if self.log_requests and not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        g.request_timings = RequestTimings()
+
+    @staticmethod
+    def _current():
+        return g.get('request_timings') if has_request_context() else None
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._timing_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        timings = self._current()
+        started = getattr(context, '_timing_started', None)
+        if timings is None or started is None:
+            return
+        elapsed = time.perf_counter() - started
+        timings.statements += 1
+        timings.sql_seconds += elapsed
+        if elapsed > timings.slowest_seconds:
+            timings.slowest_seconds = elapsed
+            timings.slowest_statement = statement
+
+    def _before_render(self, sender, template, context, **extra):
+        timings = self._current()
+        if timings is not None:
+            timings._render_started = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        timings = self._current()
+        if timings is not None and timings._render_started is not None:
+            timings.render_seconds += time.perf_counter() - timings._render_started
+            timings._render_started = None
+
+    def _finish(self, response):
+        timings = g.pop('request_timings', None)
+        if timings is None:
+            return response
+        total = time.perf_counter() - timings.started
+        endpoint = request.endpoint or 'none'
+        label = (endpoint,)
+        with self._lock:
+            self.requests.inc((endpoint, response.status_code))
+            self.duration.observe(label, total)
+            self.sql_duration.observe(label, timings.sql_seconds)
+            self.render_duration.observe(label, timings.render_seconds)
+            self.statements.observe(label, timings.statements)
+
+        if self.server_timing:
+            response.headers['Server-Timing'] = (
+                f'sql;dur={timings.sql_seconds * 1000:.2f};desc="{timings.statements} statements", '
+                f'render;dur={timings.render_seconds * 1000:.2f}, total;dur={total * 1000:.2f}'
+            )
+        # Test and benchmark runs keep their output clean
+        if self.log_requests and not current_app.testing and logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 2),
+                'sql_ms': round(timings.sql_seconds * 1000, 2),
+                'statements': timings.statements,
+                'render_ms': round(timings.render_seconds * 1000, 2),
+                'slowest_sql_ms': round(timings.slowest_seconds * 1000, 2),
+                'slowest_sql': ' '.join(timings.slowest_statement.split())[:STATEMENT_PREVIEW]
+                               if timings.slowest_statement else None,
+            }))
+        return response
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = []
+            for metric in (self.requests, self.duration, self.sql_duration, self.render_duration,
+                           self.statements):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,198 @@
+"""
+Versioned schema migrations for an existing Student News database
+Each migration runs once and is recorded in the schema_version table
+Works against whatever DATABASE_URL points at (SQLite or MySQL)
+Usage: python migrate_schema.py
+"""
+import sys
+from datetime import datetime
+from sqlalchemy import inspect, text
+from app import app, db
+from search import install_search_index
+from models import Upload, Category
+from categories import DEFAULT_CATEGORIES
+
+def create_index(connection, name, table, columns):
+    """Create an index unless one with the same name already exists"""
+    existing = {index['name'] for index in inspect(connection).get_indexes(table)}
+    if name in existing:
+        print(f"  • {name} already exists")
+        return
+    connection.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+    print(f"  • created {name}")
+
+def migration_001_hot_path_indexes(connection):
+    """Composite indexes for the post listing, comment and share query shapes"""
+    create_index(connection, 'ix_post_created', 'post', ['created_at', 'id'])
+    create_index(connection, 'ix_post_category_created', 'post', ['category', 'created_at', 'id'])
+    create_index(connection, 'ix_post_author_created', 'post', ['author_id', 'created_at', 'id'])
+    create_index(connection, 'ix_comment_post_created', 'comment', ['post_id', 'created_at', 'id'])
+    create_index(connection, 'ix_comment_created', 'comment', ['created_at', 'id'])
+    create_index(connection, 'ix_comment_author', 'comment', ['author_id'])
+    create_index(connection, 'ix_share_post_created', 'share', ['post_id', 'created_at'])
+
+def migration_002_search_index(connection):
+    """Full-text search index over post titles and content"""
+    install_search_index(connection)
+    print("  • search index built")
+
+def migration_003_post_activity(connection):
+    """Post.last_activity_at for HTTP validators, backfilled from comments and shares"""
+    columns = [column['name'] for column in inspect(connection).get_columns('post')]
+    if 'last_activity_at' not in columns:
+        connection.execute(text("ALTER TABLE post ADD COLUMN last_activity_at DATETIME"))
+    connection.execute(text(
+        "UPDATE post SET last_activity_at = COALESCE("
+        "(SELECT MAX(created_at) FROM comment WHERE comment.post_id = post.id), created_at)"
+    ))
+    connection.execute(text(
+        "UPDATE post SET last_activity_at = (SELECT MAX(created_at) FROM share WHERE share.post_id = post.id) "
+        "WHERE (SELECT MAX(created_at) FROM share WHERE share.post_id = post.id) > last_activity_at"
+    ))
+    print("  • last_activity_at backfilled")
+
+def migration_004_image_variants(connection):
+    """Post.image_variants; run backfill_images.py afterwards to generate them"""
+    columns = [column['name'] for column in inspect(connection).get_columns('post')]
+    if 'image_variants' not in columns:
+        connection.execute(text("ALTER TABLE post ADD COLUMN image_variants VARCHAR(64)"))
+    print("  • image_variants column added")
+
+def migration_005_upload_table(connection):
+    """Upload table for content-addressed files; run dedupe_uploads.py afterwards"""
+    Upload.__table__.create(connection, checkfirst=True)
+    print("  • upload table created")
+
+def migration_006_session_version(connection):
+    """User.session_version; existing sessions keep working as version 0"""
+    columns = [column['name'] for column in inspect(connection).get_columns('user')]
+    if 'session_version' not in columns:
+        connection.execute(text("ALTER TABLE user ADD COLUMN session_version INTEGER NOT NULL DEFAULT 0"))
+    print("  • session_version column added")
+
+def migration_007_category_table(connection):
+    """Category table with post counts; Post.category becomes a SMALLINT category_id"""
+    Category.__table__.create(connection, checkfirst=True)
+    mysql = connection.dialect.name == 'mysql'
+    columns = [column['name'] for column in inspect(connection).get_columns('post')]
+    if 'category' in columns:
+        # The standard categories first, then whatever else posts were filed under
+        used = set(connection.execute(text("SELECT DISTINCT category FROM post")).scalars())
+        existing = set(connection.execute(text("SELECT name FROM category")).scalars())
+        for name in DEFAULT_CATEGORIES + sorted(used - set(DEFAULT_CATEGORIES)):
+            if name not in existing:
+                connection.execute(text("INSERT INTO category (name, post_count) VALUES (:name, 0)"), {'name': name})
+        print(f"  • {len(used)} categories in use")
+    if 'category_id' not in columns:
+        connection.execute(text("ALTER TABLE post ADD COLUMN category_id SMALLINT REFERENCES category(id)"))
+    if 'category' in columns:
+        connection.execute(text(
+            "UPDATE post SET category_id = (SELECT id FROM category WHERE category.name = post.category)"
+        ))
+        # The old index is on the string column, and has to go before the column can
+        indexes = {index['name'] for index in inspect(connection).get_indexes('post')}
+        if 'ix_post_category_created' in indexes:
+            connection.execute(text("DROP INDEX ix_post_category_created" + (" ON post" if mysql else "")))
+        connection.execute(text("ALTER TABLE post DROP COLUMN category"))
+        print("  • posts moved to category_id")
+    if mysql:
+        # SQLite cannot add NOT NULL or a foreign key to an existing column
+        connection.execute(text("ALTER TABLE post MODIFY category_id SMALLINT NOT NULL"))
+        foreign_keys = {key['name'] for key in inspect(connection).get_foreign_keys('post')}
+        if 'fk_post_category' not in foreign_keys:
+            connection.execute(text(
+                "ALTER TABLE post ADD CONSTRAINT fk_post_category FOREIGN KEY (category_id) REFERENCES category (id)"
+            ))
+    create_index(connection, 'ix_post_category_created', 'post', ['category_id', 'created_at', 'id'])
+    connection.execute(text(
+        "UPDATE category SET post_count = (SELECT COUNT(*) FROM post WHERE post.category_id = category.id)"
+    ))
+    print("  • category post counts filled in")
+
+def migration_008_post_counters(connection):
+    """Post.comment_count / Post.share_count, backfilled from the comment and share tables"""
+    columns = [column['name'] for column in inspect(connection).get_columns('post')]
+    added = [name for name in ('comment_count', 'share_count') if name not in columns]
+    for name in added:
+        connection.execute(text(f"ALTER TABLE post ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0"))
+    if added:
+        # Databases that already had the columns have been keeping them up to date
+        connection.execute(text(
+            "UPDATE post SET "
+            "comment_count = (SELECT COUNT(*) FROM comment WHERE comment.post_id = post.id), "
+            "share_count = (SELECT COUNT(*) FROM share WHERE share.post_id = post.id)"
+        ))
+        print(f"  • added and backfilled {', '.join(added)}")
+    else:
+        print("  • counter columns already exist")
+
+def migration_009_upload_released_at(connection):
+    """Upload.released_at, so unused uploads are swept after a grace period"""
+    columns = [column['name'] for column in inspect(connection).get_columns('upload')]
+    if 'released_at' not in columns:
+        connection.execute(text("ALTER TABLE upload ADD COLUMN released_at DATETIME"))
+    # Uploads already unused start their grace period now
+    connection.execute(
+        text("UPDATE upload SET released_at = :now WHERE ref_count <= 0 AND released_at IS NULL"),
+        {'now': datetime.utcnow()}
+    )
+
+# Append new migrations here; never renumber or edit one that has shipped
+MIGRATIONS = [
+    (1, migration_001_hot_path_indexes),
+    (2, migration_002_search_index),
+    (3, migration_003_post_activity),
+    (4, migration_004_image_variants),
+    (5, migration_005_upload_table),
+    (6, migration_006_session_version),
+    (7, migration_007_category_table),
+    (8, migration_008_post_counters),
+    (9, migration_009_upload_released_at),
+]
+
+def applied_versions():
+    """Create the bookkeeping table if needed and return the applied versions"""
+    with db.engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, applied_at DATETIME NOT NULL)"
+        ))
+        return {row[0] for row in connection.execute(text("SELECT version FROM schema_version"))}
+
+def require_migrations(*versions):
+    """Exit with a message unless every migration in ``versions`` has been applied"""
+    missing = sorted(set(versions) - applied_versions())
+    if missing:
+        print(f"❌ This database is missing schema migration(s) {', '.join(f'{v:03d}' for v in missing)}.")
+        print("Run python migrate_schema.py first.")
+        sys.exit(1)
+
+def migrate():
+    """Apply every migration that has not been recorded yet, in order"""
+    applied = applied_versions()
+    pending = [(version, migration) for version, migration in MIGRATIONS if version not in applied]
+
+    if not pending:
+        print("✅ Database schema is already up to date!")
+        return
+
+    for version, migration in pending:
+        print(f"📋 Applying migration {version:03d}: {migration.__doc__}")
+        with db.engine.begin() as connection:
+            migration(connection)
+            connection.execute(
+                text("INSERT INTO schema_version (version, applied_at) VALUES (:version, :applied_at)"),
+                {'version': version, 'applied_at': datetime.utcnow()}
+            )
+        print(f"✅ Migration {version:03d} applied!")
+
+if __name__ == '__main__':
+    try:
+        with app.app_context():
+            migrate()
+        print("\n🎉 Database migration complete!")
+        print("🚀 Now restart the server: python app.py")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        print("Please make sure the database file is not locked by another process.")
+        sys.exit(1)
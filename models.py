@@ -1,9 +1,26 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.orm.util import identity_key
+from database import RoutingSession, note_write
 from datetime import datetime
+from sqlalchemy import case, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+# Reads of replica-routed requests go to a replica; see database.py
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def insert_ignore(connection, table, **values):
+    """INSERT a row unless it would violate a unique key; returns rows inserted (0 or 1)"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        statement = sqlite_insert(table).values(**values).on_conflict_do_nothing()
+    elif dialect == 'mysql':
+        statement = mysql_insert(table).values(**values).prefix_with('IGNORE')
+    else:
+        statement = table.insert().values(**values)
+    return connection.execute(statement).rowcount
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -12,6 +29,9 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(256), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped when the password or admin flag changes; sessions carry it in
+    # their user id, so ones issued before the change no longer load
+    session_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
     posts = db.relationship('Post', backref='author', lazy=True, cascade='all, delete-orphan')
@@ -24,15 +44,35 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
     
+    def get_id(self):
+        return f'{self.id}:{self.session_version or 0}'
+    
     def __repr__(self):
         return f'<User {self.username}>'
 
+class Category(db.Model):
+    # SMALLINT keeps post.category_id and its listing index narrow; SQLite
+    # only auto-assigns ids to INTEGER PRIMARY KEY columns
+    id = db.Column(db.SmallInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    # Kept in step by _maintain_category_counts below, so category chips
+    # never need a GROUP BY over the post table
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    def __str__(self):
+        return self.name
+    
+    def __repr__(self):
+        return f'<Category {self.name}>'
+
 class Post(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    category = db.Column(db.String(50), nullable=False)
+    category_id = db.Column(db.SmallInteger, db.ForeignKey('category.id'), nullable=False)
     image_filename = db.Column(db.String(255), nullable=True)
+    # Comma-separated resized variants written by images.ImagePipeline, e.g. 'card,medium,full'
+    image_variants = db.Column(db.String(64), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -40,9 +80,27 @@ class Post(db.Model):
     # Relationships
     comments = db.relationship('Comment', backref='post', lazy=True, cascade='all, delete-orphan')
     shares = db.relationship('Share', backref='post', lazy=True, cascade='all, delete-orphan')
+    category = db.relationship('Category')
+    
+    # Denormalized counters, kept in step by _maintain_post_counters below so
+    # templates never load the comments/shares collections just to count them
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    share_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Moves on every comment/share add or delete, so HTTP validators change
+    # even when a count returns to an earlier value
+    last_activity_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Listing indexes: newest first, optionally narrowed by category or author.
+    # id is the keyset tie-breaker so pages are read straight off the index.
+    __table_args__ = (
+        db.Index('ix_post_created', 'created_at', 'id'),
+        db.Index('ix_post_category_created', 'category_id', 'created_at', 'id'),
+        db.Index('ix_post_author_created', 'author_id', 'created_at', 'id'),
+    )
     
-    def share_count(self):
-        return len(self.shares)
+    @property
+    def image_variant_names(self):
+        return self.image_variants.split(',') if self.image_variants else []
     
     def __repr__(self):
         return f'<Post {self.title}>'
@@ -54,17 +112,213 @@ class Comment(db.Model):
     author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
     
+    # A post's comments newest first, all comments newest first (admin), and a
+    # user's comments for profile/cascades
+    __table_args__ = (
+        db.Index('ix_comment_post_created', 'post_id', 'created_at', 'id'),
+        db.Index('ix_comment_created', 'created_at', 'id'),
+        db.Index('ix_comment_author', 'author_id'),
+    )
+    
     def __repr__(self):
         return f'<Comment {self.id}>'
 
+class Upload(db.Model):
+    # Stored under the SHA-256 of its bytes, so identical images share one file.
+    # ref_count is the number of posts using it, kept by _maintain_upload_refs;
+    # released_at is when it last dropped to zero, and uploads.sweep_uploads
+    # removes rows (and files) that have stayed unused past a grace period
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    filename = db.Column(db.String(255), unique=True, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    variants = db.Column(db.String(64), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    released_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<Upload {self.filename}>'
+
 class Share(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
     
-    # Ensure one user can only share a post once
-    __table_args__ = (db.UniqueConstraint('user_id', 'post_id', name='_user_post_uc'),)
+    # Ensure one user can only share a post once; the constraint's index also
+    # serves the user+post lookup, the second index serves per-post lookups
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='_user_post_uc'),
+        db.Index('ix_share_post_created', 'post_id', 'created_at'),
+    )
     
     def __repr__(self):
         return f'<Share {self.id}>'
+
+def record_share(session, user_id, post_id):
+    """
+    Share a post with a single INSERT that skips an existing share instead of
+    raising, so concurrent clicks cannot race; False if it was already shared.
+    The Core insert bypasses _maintain_post_counters, so the post's
+    share_count and last_activity_at are bumped here in the same transaction.
+    The caller commits.
+    """
+    connection = session.connection()
+    now = datetime.utcnow()
+    if not insert_ignore(connection, Share.__table__, user_id=user_id, post_id=post_id, created_at=now):
+        return False
+    post_table = Post.__table__
+    connection.execute(
+        post_table.update()
+        .where(post_table.c.id == post_id)
+        .values(share_count=post_table.c.share_count + 1, last_activity_at=now)
+    )
+    note_write(session)
+    post = session.identity_map.get(identity_key(Post, post_id))
+    if post is not None:
+        session.expire(post, ['share_count', 'last_activity_at'])
+    return True
+
+
+# Keep Post.comment_count / Post.share_count in the same transaction as the
+# comment and share rows being written, including rows removed by cascades
+@db.event.listens_for(db.session, 'after_flush')
+def _maintain_post_counters(session, flush_context):
+    deleted_posts = {obj.id for obj in session.deleted if isinstance(obj, Post)}
+    deltas = {}
+    
+    for objects, step in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            if isinstance(obj, Comment):
+                column = 'comment_count'
+            elif isinstance(obj, Share):
+                column = 'share_count'
+            else:
+                continue
+            if obj.post_id in deleted_posts:
+                continue
+            counts = deltas.setdefault(obj.post_id, {'comment_count': 0, 'share_count': 0})
+            counts[column] += step
+    
+    post_table = Post.__table__
+    now = datetime.utcnow()
+    for post_id, counts in deltas.items():
+        session.connection().execute(
+            post_table.update()
+            .where(post_table.c.id == post_id)
+            .values(
+                comment_count=post_table.c.comment_count + counts['comment_count'],
+                share_count=post_table.c.share_count + counts['share_count'],
+                last_activity_at=now,
+            )
+        )
+    session.info.setdefault('stale_post_counters', set()).update(deltas)
+
+@db.event.listens_for(db.session, 'after_flush_postexec')
+def _expire_post_counters(session, flush_context):
+    for post_id in session.info.pop('stale_post_counters', ()):
+        post = session.identity_map.get(identity_key(Post, post_id))
+        if post is not None:
+            session.expire(post, ['comment_count', 'share_count', 'last_activity_at'])
+
+
+def _category_ids(post, deleted=False):
+    """(released, acquired) category ids for a post in the current flush"""
+    history = db.inspect(post).attrs.category_id.history
+    if deleted:
+        return [id for id in (history.deleted or history.unchanged) if id], []
+    return [id for id in history.deleted if id], [id for id in history.added if id]
+
+# Keep Category.post_count in step with the posts in each category,
+# including posts removed by cascades (a user's posts)
+@db.event.listens_for(db.session, 'after_flush')
+def _maintain_category_counts(session, flush_context):
+    deltas = {}
+    changed = False
+    for objects, deleted in ((session.new, False), (session.dirty, False), (session.deleted, True)):
+        for obj in objects:
+            if isinstance(obj, Category):
+                changed = True
+            if not isinstance(obj, Post):
+                continue
+            released, acquired = _category_ids(obj, deleted)
+            for category_id in released:
+                deltas[category_id] = deltas.get(category_id, 0) - 1
+            for category_id in acquired:
+                deltas[category_id] = deltas.get(category_id, 0) + 1
+    
+    deltas = {category_id: delta for category_id, delta in deltas.items() if delta}
+    category_table = Category.__table__
+    for category_id, delta in deltas.items():
+        session.connection().execute(
+            category_table.update()
+            .where(category_table.c.id == category_id)
+            .values(post_count=category_table.c.post_count + delta)
+        )
+    if deltas or changed:
+        # Read by categories.CategoryCache once the transaction commits
+        session.info['stale_categories'] = True
+        session.info.setdefault('stale_category_counts', set()).update(deltas)
+
+@db.event.listens_for(db.session, 'after_flush_postexec')
+def _expire_category_counts(session, flush_context):
+    for category_id in session.info.pop('stale_category_counts', ()):
+        category = session.identity_map.get(identity_key(Category, category_id))
+        if category is not None:
+            session.expire(category, ['post_count'])
+
+
+def _image_filenames(post, deleted=False):
+    """(released, acquired) image filenames for a post in the current flush"""
+    history = db.inspect(post).attrs.image_filename.history
+    if deleted:
+        return [name for name in (history.deleted or history.unchanged) if name], []
+    return [name for name in history.deleted if name], [name for name in history.added if name]
+
+# Keep Upload.ref_count in step with the posts pointing at each file. Rows
+# that reach zero are only stamped with released_at: deleting the file here
+# would race a concurrent upload of the same image that has just decided to
+# reuse it, so uploads.sweep_uploads removes them once the grace period is up
+@db.event.listens_for(db.session, 'after_flush')
+def _maintain_upload_refs(session, flush_context):
+    deltas = {}
+    for objects, deleted in ((session.new, False), (session.dirty, False), (session.deleted, True)):
+        for obj in objects:
+            if not isinstance(obj, Post):
+                continue
+            released, acquired = _image_filenames(obj, deleted)
+            for name in released:
+                deltas[name] = deltas.get(name, 0) - 1
+            for name in acquired:
+                deltas[name] = deltas.get(name, 0) + 1
+    
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    
+    upload_table = Upload.__table__
+    connection = session.connection()
+    now = datetime.utcnow()
+    for name, delta in deltas.items():
+        references = upload_table.c.ref_count + delta
+        # released_at first: MySQL evaluates SET left to right, so it must
+        # still see the old ref_count
+        connection.execute(
+            upload_table.update()
+            .where(upload_table.c.filename == name)
+            .ordered_values(
+                (upload_table.c.released_at,
+                 case((references > 0, None), else_=func.coalesce(upload_table.c.released_at, now))),
+                (upload_table.c.ref_count, references),
+            )
+        )
+    session.info.setdefault('stale_uploads', set()).update(deltas)
+
+@db.event.listens_for(db.session, 'after_flush_postexec')
+def _expire_upload_refs(session, flush_context):
+    stale = session.info.pop('stale_uploads', ())
+    if stale:
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, Upload) and obj.filename in stale:
+                session.expire(obj, ['ref_count'])
@@ -0,0 +1,287 @@
+"""
+Rendered-page cache for anonymous visitors
+Pages are stored with a set of tags ('posts', 'post:12', ...) and the write
+routes invalidate exactly the tags they affect. Two backends are available:
+an in-process LRU for a single worker and a filesystem cache shared by
+every worker on the host.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session, make_response
+from flask_login import current_user
+from database import primary_reads
+
+# Every entry carries this tag so clear() is just another invalidation
+ALL_TAG = '*'
+
+# Response headers kept with a cached page so hits still revalidate
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+class CacheStats:
+    """Hit/miss/eviction counters, safe to bump from several threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def bump(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'invalidations': self.invalidations}
+
+class MemoryCache:
+    """Bounded LRU with a per-entry TTL, local to one process"""
+
+    def __init__(self, max_entries=1024, default_ttl=60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._entries = OrderedDict()  # key -> (expires, value, tags)
+        self._tags = {}                # tag -> set of keys
+        self._versions = {}            # tag -> number of invalidations
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.stats.bump('misses')
+                return None
+            self._entries.move_to_end(key)
+        self.stats.bump('hits')
+        return entry[1]
+
+    def tag_versions(self, tags):
+        with self._lock:
+            return {tag: self._versions.get(tag, 0) for tag in set(tags) | {ALL_TAG}}
+
+    def set(self, key, value, tags=(), ttl=None, versions=None):
+        tags = set(tags) | {ALL_TAG}
+        expires = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            # A tag invalidated since ``versions`` were read means the value may be stale
+            if versions is not None and any(self._versions.get(tag, 0) != version
+                                            for tag, version in versions.items()):
+                return
+            self._remove(key)
+            self._entries[key] = (expires, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats.bump('evictions')
+
+    def invalidate_tags(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+        self.stats.bump('invalidations', len(tags))
+
+    def clear(self):
+        self.invalidate_tags(ALL_TAG)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for tag in entry[2]:
+                keys = self._tags.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tags[tag]
+
+class FileSystemCache:
+    """
+    Cache shared by all workers on one host
+
+    Each entry records the version of every tag it was stored under, as read
+    before the page was rendered;
+    invalidating a tag bumps its version file, so stale entries are
+    detected on read without having to find and delete them. A tag's
+    version is the length of its file and a bump appends one byte, which
+    is atomic, so concurrent invalidations from several workers all count.
+    """
+
+    def __init__(self, directory, max_entries=4096, default_ttl=60):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._entry_dir = os.path.join(directory, 'entries')
+        self._tag_dir = os.path.join(directory, 'tags')
+        os.makedirs(self._entry_dir, exist_ok=True)
+        os.makedirs(self._tag_dir, exist_ok=True)
+        self._writes = 0
+
+    @staticmethod
+    def _digest(value):
+        return hashlib.sha1(value.encode()).hexdigest()
+
+    def _tag_version(self, tag):
+        try:
+            return os.stat(os.path.join(self._tag_dir, self._digest(tag))).st_size
+        except OSError:
+            return 0
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        path = os.path.join(self._entry_dir, self._digest(key))
+        try:
+            with open(path, 'rb') as f:
+                expires, value, versions = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.stats.bump('misses')
+            return None
+        if expires < time.time() or any(self._tag_version(tag) != version for tag, version in versions.items()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.stats.bump('misses')
+            return None
+        self.stats.bump('hits')
+        return value
+
+    def tag_versions(self, tags):
+        return {tag: self._tag_version(tag) for tag in set(tags) | {ALL_TAG}}
+
+    def set(self, key, value, tags=(), ttl=None, versions=None):
+        if versions is None:
+            versions = self.tag_versions(tags)
+        expires = time.time() + (ttl or self.default_ttl)
+        path = os.path.join(self._entry_dir, self._digest(key))
+        self._write_atomic(path, pickle.dumps((expires, value, versions)))
+        self._writes += 1
+        if self._writes % 64 == 0:
+            self._evict()
+
+    def invalidate_tags(self, *tags):
+        for tag in tags:
+            # O_APPEND: no read-modify-write, so two workers cannot both write the same version
+            fd = os.open(os.path.join(self._tag_dir, self._digest(tag)), os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+            try:
+                os.write(fd, b'.')
+            finally:
+                os.close(fd)
+        self.stats.bump('invalidations', len(tags))
+
+    def clear(self):
+        self.invalidate_tags(ALL_TAG)
+
+    def __len__(self):
+        return len(os.listdir(self._entry_dir))
+
+    def _evict(self):
+        """Drop the least recently written entries once over max_entries"""
+        entries = []
+        for name in os.listdir(self._entry_dir):
+            try:
+                entries.append((os.path.getmtime(os.path.join(self._entry_dir, name)), name))
+            except OSError:
+                pass
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+        for _, name in sorted(entries)[:excess]:
+            try:
+                os.remove(os.path.join(self._entry_dir, name))
+                self.stats.bump('evictions')
+            except OSError:
+                pass
+
+class PageCache:
+    """Flask glue: caches whole anonymous GET responses and invalidates by tag"""
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('PAGE_CACHE_BACKEND', 'memory')
+        ttl = app.config.get('PAGE_CACHE_TTL', 60)
+        max_entries = app.config.get('PAGE_CACHE_MAX_ENTRIES', 1024)
+        if backend == 'memory':
+            self.backend = MemoryCache(max_entries=max_entries, default_ttl=ttl)
+        elif backend == 'filesystem':
+            directory = app.config.get('PAGE_CACHE_DIR') or os.path.join(app.instance_path, 'page_cache')
+            self.backend = FileSystemCache(directory, max_entries=max_entries, default_ttl=ttl)
+        else:
+            self.backend = None
+
+    def _cacheable(self):
+        # Logged-in pages are personalised and pending flashes are one-off
+        return (self.backend is not None and request.method == 'GET'
+                and not current_user.is_authenticated and '_flashes' not in session)
+
+    def cached(self, tags):
+        """Cache a view's rendered response under ``tags(**view_args)``"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                if not self._cacheable():
+                    return view(**kwargs)
+                key = request.full_path
+                hit = self.backend.get(key)
+                if hit is not None:
+                    body, mimetype, headers = hit
+                    response = make_response(body)
+                    response.mimetype = mimetype
+                    response.headers.update(headers)
+                    response.headers['X-Page-Cache'] = 'HIT'
+                    return response.make_conditional(request)
+                # Read before rendering: an invalidation that lands while the
+                # view runs must make this entry stale, not be missed by it
+                entry_tags = tags(**kwargs)
+                versions = self.backend.tag_versions(entry_tags)
+                # Rendered from the primary: served to everyone until the TTL,
+                # so it must not capture a replica still behind the write that
+                # just invalidated the tag
+                with primary_reads():
+                    response = make_response(view(**kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+                    self.backend.set(key, (response.get_data(), response.mimetype, headers), entry_tags,
+                                     versions=versions)
+                    response.headers['X-Page-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        if self.backend is not None:
+            self.backend.invalidate_tags(*tags)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        if self.backend is None:
+            return {'backend': None}
+        stats = self.backend.stats.as_dict()
+        stats['backend'] = type(self.backend).__name__
+        stats['entries'] = len(self.backend)
+        return stats
@@ -0,0 +1,103 @@
+"""
+Keyset (cursor) pagination helpers
+Pages are addressed by the sort key of their first/last row instead of an
+OFFSET, so page 5,000 costs the same index seek as page 1
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+class KeysetPage:
+    """One page of results plus the opaque cursors for its neighbours"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+def encode_cursor(values):
+    """Turn a sort key tuple into an opaque, URL-safe token"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token, columns):
+    """Turn a token back into a sort key tuple, or None if it is malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            return None
+        values = []
+        for column, value in zip(columns, payload):
+            expected = column.type.python_type
+            if expected is datetime:
+                if not isinstance(value, str):
+                    return None
+                value = datetime.fromisoformat(value)
+            # Exact type, so lists, dicts, None and bools never reach the query
+            elif type(value) is not expected:
+                return None
+            values.append(value)
+        return tuple(values)
+    except (ValueError, TypeError, NotImplementedError):
+        return None
+
+def _seek(columns, values, forward):
+    """
+    Rows strictly after (``forward``) or before ``values`` in descending
+    order of ``columns``. The redundant bound on the leading column gives
+    the planner an index range to seek into on both SQLite and MySQL.
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, column < values[i] if forward else column > values[i]))
+    leading = columns[0] <= values[0] if forward else columns[0] >= values[0]
+    return and_(leading, or_(*clauses))
+
+def keyset_paginate(query, columns, after=None, before=None, per_page=9, total=None):
+    """
+    Page through ``query`` in descending order of ``columns``
+
+    ``columns`` must end in a unique column (normally the primary key) so
+    the order is total. ``after`` continues forward from a next_cursor,
+    ``before`` walks back from a prev_cursor; with neither, the first page
+    is returned.
+    """
+    after_key = decode_cursor(after, columns)
+    before_key = decode_cursor(before, columns)
+
+    if before_key is not None:
+        rows = query.filter(_seek(columns, before_key, forward=False)) \
+            .order_by(*[column.asc() for column in columns]) \
+            .limit(per_page + 1).all()
+        more_before = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_prev, has_next = more_before, True
+    else:
+        if after_key is not None:
+            query = query.filter(_seek(columns, after_key, forward=True))
+        rows = query.order_by(*[column.desc() for column in columns]) \
+            .limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_prev, has_next = after_key is not None, len(rows) > per_page
+
+    def key_of(item):
+        return tuple(getattr(item, column.key) for column in columns)
+
+    next_cursor = encode_cursor(key_of(items[-1])) if items and has_next else None
+    prev_cursor = encode_cursor(key_of(items[0])) if items and has_prev else None
+    return KeysetPage(items, next_cursor, prev_cursor, total)
@@ -0,0 +1,155 @@
+"""
+Password hashing off the request threads
+scrypt/pbkdf2 deliberately burn tens of milliseconds of CPU per hash. Login
+and register hand that work to a small process pool, and at most
+PASSWORD_HASH_QUEUE hashes may be queued or running at once: past that the
+request is turned away with 503 + Retry-After instead of tying up another
+request thread, so a login spike cannot starve the rest of the site.
+PASSWORD_HASH_METHOD picks the Werkzeug method; hashes made with older
+settings are upgraded the next time their owner logs in.
+The pool's processes run at a lower priority (PASSWORD_HASH_NICE) so page
+requests win the CPU. PASSWORD_HASH_WORKERS=0 hashes on the request thread
+(still queue-limited).
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from sqlalchemy import update
+from werkzeug.security import generate_password_hash, check_password_hash
+from models import db, User
+
+DEFAULT_METHOD = 'scrypt'
+
+class HashingBusy(Exception):
+    """Too many hashes already queued; the client should retry shortly"""
+
+def _init_worker(niceness):
+    # Page requests win the CPU whenever both want it
+    if niceness and hasattr(os, 'nice'):
+        os.nice(niceness)
+
+def default_workers():
+    return max(1, (os.cpu_count() or 2) // 2)
+
+class PasswordHasher:
+    """Bounded hashing pool shared by the login and register routes"""
+
+    def __init__(self, app=None):
+        self.method = DEFAULT_METHOD
+        self.workers = 0
+        self.queue_limit = 1
+        self.timeout = 10
+        self.retry_after = 5
+        self.niceness = 10
+        self._pool = None
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._method_prefix = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', 5)
+        self.niceness = app.config.get('PASSWORD_HASH_NICE', 10)
+        workers = app.config.get('PASSWORD_HASH_WORKERS')
+        self.configure(default_workers() if workers is None else workers,
+                       app.config.get('PASSWORD_HASH_QUEUE'))
+        app.extensions['password_hasher'] = self
+        atexit.register(self.shutdown)
+
+    def configure(self, workers, queue_limit=None):
+        """Resize the pool; ``queue_limit`` defaults to four hashes per worker"""
+        self.shutdown()
+        self.workers = workers
+        self.queue_limit = queue_limit or max(1, workers) * 4
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # fork keeps workers from re-importing the app; elsewhere use the default
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                 initializer=_init_worker, initargs=(self.niceness,))
+            return self._pool
+
+    def check_capacity(self):
+        """Raise HashingBusy now if a hash would be refused, before doing other work"""
+        if self._in_flight >= self.queue_limit:
+            raise HashingBusy()
+
+    def _acquire(self):
+        with self._in_flight_lock:
+            if self._in_flight >= self.queue_limit:
+                raise HashingBusy()
+            self._in_flight += 1
+
+    def _release(self, future=None):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+
+    def _run(self, function, *args):
+        self._acquire()
+        if self.workers == 0:
+            try:
+                return function(*args)
+            finally:
+                self._release()
+        try:
+            future = self._executor().submit(function, *args)
+        except Exception:
+            self._release()
+            raise
+        # The slot is held until the hash is done, even if this request gives up
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashingBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def method_prefix(self):
+        """The configured method with its parameters, as it appears in a hash"""
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._method_prefix
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split('$', 1)[0] != self.method_prefix()
+
+    def rehash_if_needed(self, user, password):
+        """
+        Upgrade ``user``'s hash to the configured method after a successful
+        login. Skipped when the pool is busy; the next login tries again.
+        The UPDATE bypasses the unit of work, so it does not count as a
+        password change and the user's other sessions stay valid.
+        """
+        old = user.password_hash
+        if not self.needs_rehash(old):
+            return False
+        try:
+            new = self.hash(password)
+        except HashingBusy:
+            return False
+        db.session.execute(
+            update(User).where(User.id == user.id, User.password_hash == old).values(password_hash=new)
+        )
+        db.session.commit()
+        return True
@@ -0,0 +1,162 @@
+"""
+Full-text search over posts
+SQLite uses an FTS5 index kept in sync with the post table by triggers;
+MySQL uses a FULLTEXT index on the same columns. Either way search never
+falls back to LIKE '%...%' scans.
+"""
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import Float, Integer, event, text
+from sqlalchemy.orm import joinedload
+from sqlalchemy.sql import column
+from models import db, Post
+from pagination import KeysetPage, encode_cursor, decode_cursor
+
+# Private-use characters mark highlighted terms until the text is escaped
+MARK_START, MARK_END = '\ue000', '\ue001'
+SNIPPET_TOKENS = 24
+
+# Title matches count ten times as much as body matches
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5(
+        title, content, content='post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    "INSERT INTO post_fts(post_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    """CREATE TRIGGER IF NOT EXISTS post_fts_insert AFTER INSERT ON post BEGIN
+        INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS post_fts_delete AFTER DELETE ON post BEGIN
+        INSERT INTO post_fts(post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    # Only fires for text edits, not for counter updates
+    """CREATE TRIGGER IF NOT EXISTS post_fts_update AFTER UPDATE OF title, content ON post BEGIN
+        INSERT INTO post_fts(post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+]
+
+MYSQL_INDEX = 'ft_post_title_content'
+
+def install_search_index(connection):
+    """Create the search index (and its triggers on SQLite) and fill it"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql("INSERT INTO post_fts(post_fts) VALUES ('rebuild')")
+    elif dialect == 'mysql':
+        indexes = connection.exec_driver_sql(
+            "SHOW INDEX FROM post WHERE Key_name = %s", (MYSQL_INDEX,)
+        ).fetchall()
+        if not indexes:
+            connection.exec_driver_sql(f"ALTER TABLE post ADD FULLTEXT INDEX {MYSQL_INDEX} (title, content)")
+
+@event.listens_for(Post.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
+
+@event.listens_for(Post.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("DROP TABLE IF EXISTS post_fts")
+
+def _fts_query(q):
+    """Quote every term so user input is never parsed as FTS5 syntax"""
+    terms = re.findall(r'\w+', q)
+    return ' '.join('"%s"' % term for term in terms)
+
+def _highlight(value):
+    """Escape ``value`` and turn the term markers into <mark> tags"""
+    return Markup(str(escape(value)).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+def _mark_terms(value, terms):
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    return pattern.sub(lambda match: MARK_START + match.group(0) + MARK_END, value)
+
+def _python_snippet(value, terms, width=160):
+    """Snippet around the first matching term, for backends without snippet()"""
+    lowered = value.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [position for position in positions if position >= 0]
+    start = max(min(positions) - width // 4, 0) if positions else 0
+    excerpt = value[start:start + width]
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(value) else ''
+    return prefix + _mark_terms(excerpt, terms) + suffix
+
+class SearchResult:
+    """A matching post with its rank and highlighted title/snippet"""
+
+    def __init__(self, post, rank, title, snippet):
+        self.post = post
+        self.rank = rank
+        self.title = _highlight(title)
+        self.snippet = _highlight(snippet)
+
+# Results are ordered by (rank, id) ascending; lower rank is a better match
+CURSOR_COLUMNS = [column('rank', Float), column('id', Integer)]
+
+def _sqlite_matches(fts_query, category_id, after_key, limit):
+    sql = """
+        SELECT post.id, post_fts.rank,
+               highlight(post_fts, 0, :mark_start, :mark_end),
+               snippet(post_fts, 1, :mark_start, :mark_end, '…', :tokens)
+        FROM post_fts JOIN post ON post.id = post_fts.rowid
+        WHERE post_fts MATCH :q
+    """
+    params = {'q': fts_query, 'mark_start': MARK_START, 'mark_end': MARK_END,
+              'tokens': SNIPPET_TOKENS, 'limit': limit}
+    if category_id is not None:
+        sql += " AND post.category_id = :category_id"
+        params['category_id'] = category_id
+    if after_key:
+        sql += " AND (post_fts.rank > :rank OR (post_fts.rank = :rank AND post.id > :id))"
+        params['rank'], params['id'] = after_key
+    sql += " ORDER BY post_fts.rank, post.id LIMIT :limit"
+    return db.session.execute(text(sql), params).fetchall()
+
+def _mysql_matches(terms, category_id, after_key, limit):
+    # Negate the relevance score so both backends sort ascending
+    score = "-MATCH(post.title, post.content) AGAINST (:q IN NATURAL LANGUAGE MODE)"
+    sql = f"""
+        SELECT post.id, {score} AS relevance, post.title, post.content
+        FROM post
+        WHERE MATCH(post.title, post.content) AGAINST (:q IN NATURAL LANGUAGE MODE)
+    """
+    params = {'q': ' '.join(terms), 'limit': limit}
+    if category_id is not None:
+        sql += " AND post.category_id = :category_id"
+        params['category_id'] = category_id
+    if after_key:
+        sql += f" AND ({score} > :rank OR ({score} = :rank AND post.id > :id))"
+        params['rank'], params['id'] = after_key
+    sql += " ORDER BY relevance, post.id LIMIT :limit"
+    rows = db.session.execute(text(sql), params).fetchall()
+    return [(post_id, rank, _mark_terms(title, terms), _python_snippet(content, terms))
+            for post_id, rank, title, content in rows]
+
+def search_posts(q, category_id=None, after=None, per_page=10):
+    """Return one KeysetPage of SearchResults for the query string ``q``"""
+    terms = re.findall(r'\w+', q or '')
+    if not terms:
+        return KeysetPage([])
+
+    after_key = decode_cursor(after, CURSOR_COLUMNS)
+    if db.session.get_bind().dialect.name == 'mysql':
+        rows = _mysql_matches(terms, category_id, after_key, per_page + 1)
+    else:
+        rows = _sqlite_matches(_fts_query(q), category_id, after_key, per_page + 1)
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    # One query for the posts themselves, authors and categories joined in
+    ids = [row[0] for row in rows]
+    posts = {post.id: post for post in
+             Post.query.options(joinedload(Post.author), joinedload(Post.category)).filter(Post.id.in_(ids))} if ids else {}
+    results = [SearchResult(posts[post_id], rank, title, snippet)
+               for post_id, rank, title, snippet in rows if post_id in posts]
+
+    next_cursor = encode_cursor((rows[-1][1], rows[-1][0])) if has_next else None
+    return KeysetPage(results, next_cursor=next_cursor)
@@ -0,0 +1,205 @@
+"""
+Slow-query log with EXPLAIN capture
+Statements slower than SLOW_QUERY_MS, and statements a single request runs
+SLOW_QUERY_REPEAT times or more (the N+1 pattern), are grouped by a
+normalized fingerprint. The first time a fingerprint is seen its plan is
+captured with EXPLAIN (EXPLAIN QUERY PLAN on SQLite) once the request is
+over, on a separate connection. Every capture is written as a JSON line to
+a rotating log, and the per-fingerprint totals back the admin page.
+Totals are per process and bounded to SLOW_QUERY_MAX_ENTRIES fingerprints.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Bound parameters are kept for EXPLAIN and the log, shortened to this length
+PARAMETER_PREVIEW = 100
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'\?|%s|%\(\w+\)s|:\w+')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+@lru_cache(maxsize=4096)
+def normalize(statement):
+    """Statement with literals and placeholders as ? and IN lists collapsed"""
+    sql = _SPACE.sub(' ', statement).strip()
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement):
+    return hashlib.sha1(normalize(statement).encode()).hexdigest()[:12]
+
+def _preview(parameters):
+    if parameters is None:
+        return None
+    values = parameters.values() if isinstance(parameters, dict) else parameters
+    return [value if isinstance(value, (int, float, type(None))) else str(value)[:PARAMETER_PREVIEW]
+            for value in values]
+
+def explain(engine, statement, parameters):
+    """The backend's plan for ``statement`` as a list of lines"""
+    if not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+        return []
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    with engine.connect() as connection:
+        result = connection.exec_driver_sql(prefix + statement, parameters)
+        if engine.dialect.name == 'sqlite':
+            return [row[-1] for row in result]
+        columns = list(result.keys())
+        return [', '.join(f'{name}={value}' for name, value in zip(columns, row) if value is not None)
+                for row in result]
+
+class SlowQueryLog:
+    """Flask glue: times statements, captures plans and keeps the offender table"""
+
+    def __init__(self, app=None, db=None):
+        self._lock = threading.Lock()
+        self._entries = {}  # (kind, fingerprint) -> entry dict
+        self.threshold = 0.1
+        self.repeat_threshold = 10
+        self.max_entries = 500
+        self.file_logger = None
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.threshold = app.config.get('SLOW_QUERY_MS', 100) / 1000
+        self.repeat_threshold = app.config.get('SLOW_QUERY_REPEAT', 10)
+        self.max_entries = app.config.get('SLOW_QUERY_MAX_ENTRIES', 500)
+        path = app.config.get('SLOW_QUERY_LOG') or os.path.join(app.instance_path, 'slow_queries.log')
+        self.file_logger = logging.getLogger(f'{__name__}.file')
+        if not self.file_logger.handlers:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=app.config.get('SLOW_QUERY_LOG_BYTES', 1024 * 1024),
+                                          backupCount=app.config.get('SLOW_QUERY_LOG_BACKUPS', 5),
+                                          delay=True)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.file_logger.addHandler(handler)
+            self.file_logger.setLevel(logging.INFO)
+            self.file_logger.propagate = False
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_execute)
+        app.teardown_request(self._finish)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_slow_query_started', None)
+        if started is None or executemany:
+            return
+        elapsed = time.perf_counter() - started
+        in_request = has_request_context()
+        if in_request:
+            seen = g.get('slow_query_seen')
+            if seen is None:
+                seen = g.slow_query_seen = {}
+            key = fingerprint(statement)
+            totals = seen.get(key)
+            if totals is None:
+                seen[key] = [1, elapsed, statement, parameters, conn.engine]
+            else:
+                totals[0] += 1
+                totals[1] += elapsed
+        if elapsed >= self.threshold:
+            capture = ('slow', statement, parameters, conn.engine, 1, elapsed)
+            if in_request:
+                g.setdefault('slow_query_captures', []).append(capture)
+            else:
+                self._record(*capture, endpoint=None, plan=False)
+
+    def _finish(self, exc):
+        captures = g.pop('slow_query_captures', [])
+        seen = g.pop('slow_query_seen', None) or {}
+        for count, total, statement, parameters, engine in seen.values():
+            if count >= self.repeat_threshold:
+                captures.append(('repeated', statement, parameters, engine, count, total))
+        if not captures:
+            return
+        endpoint = request.endpoint
+        for capture in captures:
+            try:
+                self._record(*capture, endpoint=endpoint, plan=True)
+            except Exception:
+                logger.exception("Could not record a slow query")
+
+    def _record(self, kind, statement, parameters, engine, count, seconds, endpoint, plan):
+        key = (kind, fingerprint(statement))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._make_room()
+                entry = self._entries[key] = {
+                    'kind': kind, 'fingerprint': key[1], 'sql': normalize(statement),
+                    'statement': statement, 'parameters': _preview(parameters), 'plan': None,
+                    'executions': 0, 'occurrences': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'endpoints': {}, 'first_seen': datetime.utcnow(), 'last_seen': None,
+                }
+            entry['executions'] += count
+            entry['occurrences'] += 1
+            entry['total_ms'] += seconds * 1000
+            entry['max_ms'] = max(entry['max_ms'], seconds * 1000)
+            entry['last_seen'] = datetime.utcnow()
+            name = endpoint or '-'
+            entry['endpoints'][name] = entry['endpoints'].get(name, 0) + 1
+            needs_plan = plan and entry['plan'] is None
+            if needs_plan:
+                entry['plan'] = []  # claimed; other threads skip the EXPLAIN
+
+        if needs_plan:
+            try:
+                entry['plan'] = explain(engine, statement, parameters)
+            except Exception as e:
+                entry['plan'] = [f'EXPLAIN failed: {e}']
+        self.file_logger.info(json.dumps({
+            'time': entry['last_seen'].isoformat(timespec='seconds'),
+            'kind': kind,
+            'fingerprint': key[1],
+            'endpoint': endpoint,
+            'executions': count,
+            'duration_ms': round(seconds * 1000, 2),
+            'sql': ' '.join(statement.split()),
+            'parameters': _preview(parameters),
+            'plan': entry['plan'] if needs_plan else None,
+        }, default=str))
+
+    def _make_room(self):
+        # Drop the cheapest fingerprints before a new one goes in, so the
+        # newcomer (still at 0 ms) is never the one evicted
+        excess = len(self._entries) - self.max_entries + 1
+        if excess > 0:
+            cheapest = sorted(self._entries, key=lambda key: self._entries[key]['total_ms'])
+            for key in cheapest[:excess]:
+                del self._entries[key]
+
+    def top(self, limit=50):
+        """Fingerprints with the most total time first"""
+        with self._lock:
+            entries = [dict(entry, endpoints=dict(entry['endpoints'])) for entry in self._entries.values()]
+        entries.sort(key=lambda entry: entry['total_ms'], reverse=True)
+        return entries[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,111 @@
+"""
+SQLite tuning profile
+Pragmas are applied to every new connection through a connect event, and a
+background thread periodically checkpoints the WAL and runs PRAGMA optimize.
+WAL lets readers carry on while a comment or share is being written, and
+busy_timeout makes writers queue instead of failing with "database is locked".
+"""
+import logging
+import threading
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+PROFILES = {
+    # SQLite's own defaults: rollback journal, full fsync on every commit
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        # Durable across application crashes; only an OS crash or power loss
+        # can roll back the last few commits in WAL mode
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,          # ms to wait for a lock before failing
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64000,          # negative means KiB, so 64 MB per connection
+        'temp_store': 'MEMORY',
+    },
+}
+
+def profile_pragmas(config):
+    """Pragmas for config['SQLITE_PROFILE'] with config['SQLITE_PRAGMAS'] layered on top"""
+    name = config.get('SQLITE_PROFILE', 'production')
+    if name not in PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {name!r}; expected one of {', '.join(PROFILES)}")
+    pragmas = dict(PROFILES[name])
+    pragmas.update(config.get('SQLITE_PRAGMAS') or {})
+    return pragmas
+
+def apply_pragmas(engine, pragmas):
+    """Run ``pragmas`` on every connection ``engine`` opens from now on"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+
+def checkpoint(engine, mode='PASSIVE'):
+    """Copy WAL pages back into the database; returns (busy, wal_pages, checkpointed)"""
+    with engine.connect() as connection:
+        return tuple(connection.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").one())
+
+def optimize(engine):
+    """Let SQLite refresh statistics for tables whose queries would benefit"""
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA optimize")
+
+class SQLiteMaintenance:
+    """Daemon thread running checkpoint() and optimize() on their intervals"""
+
+    def __init__(self, engine, checkpoint_interval=300, optimize_interval=3600):
+        self.engine = engine
+        self.checkpoint_interval = checkpoint_interval
+        self.optimize_interval = optimize_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.engine.dialect.name == 'sqlite':
+            self._thread = threading.Thread(target=self._run, name='sqlite-maintenance', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        since_optimize = 0
+        while not self._stop.wait(self.checkpoint_interval):
+            try:
+                busy, wal_pages, checkpointed = checkpoint(self.engine)
+                logger.debug("wal_checkpoint: busy=%s wal=%s checkpointed=%s", busy, wal_pages, checkpointed)
+                since_optimize += self.checkpoint_interval
+                if since_optimize >= self.optimize_interval:
+                    optimize(self.engine)
+                    since_optimize = 0
+            except Exception:
+                logger.exception("SQLite maintenance failed")
+
+def init_app(app, db):
+    """Apply the configured profile to the app's engines and start maintenance on the primary"""
+    with app.app_context():
+        engine = db.engine
+        engines = list(db.engines.values())
+    pragmas = profile_pragmas(app.config)
+    for each in engines:
+        apply_pragmas(each, pragmas)
+    if engine.dialect.name != 'sqlite':
+        return None
+    if pragmas.get('journal_mode', '').upper() != 'WAL':
+        return None
+    maintenance = SQLiteMaintenance(
+        engine,
+        checkpoint_interval=app.config.get('SQLITE_CHECKPOINT_INTERVAL', 300),
+        optimize_interval=app.config.get('SQLITE_OPTIMIZE_INTERVAL', 3600),
+    )
+    maintenance.start()
+    return maintenance
@@ -0,0 +1,148 @@
+// Small DOM helper: el('a', {href: '...', class: '...'}, child, 'text', ...)
+function el(tag, attrs, ...children) {
+    const node = document.createElement(tag);
+    Object.entries(attrs || {}).forEach(([key, value]) => {
+        if (key === 'class') node.className = value;
+        else node.setAttribute(key, value);
+    });
+    children.forEach(child => {
+        if (child === null || child === undefined) return;
+        node.append(child instanceof Node ? child : document.createTextNode(child));
+    });
+    return node;
+}
+
+const csrfToken = document.querySelector('meta[name="csrf-token"]').content;
+
+function deleteForm(action, message, buttonClass, label) {
+    const form = el('form', {method: 'POST', action: action, class: 'inline'});
+    form.onsubmit = () => confirm(message);
+    form.append(el('input', {type: 'hidden', name: 'csrf_token', value: csrfToken}));
+    form.append(el('button', {type: 'submit', class: buttonClass}, el('i', {class: 'fas fa-trash'}), label));
+    return form;
+}
+
+const renderers = {
+    users(user) {
+        const role = user.is_admin
+            ? el('span', {class: 'px-2 py-1 text-xs font-semibold rounded-full bg-red-100 text-red-800'}, el('i', {class: 'fas fa-user-shield mr-1'}), 'Admin')
+            : el('span', {class: 'px-2 py-1 text-xs font-semibold rounded-full bg-green-100 text-green-800'}, el('i', {class: 'fas fa-user mr-1'}), 'Student');
+        const cell = (cls, ...children) => el('td', {class: 'px-6 py-4 whitespace-nowrap ' + cls}, ...children);
+        return el('tr', {class: 'hover:bg-gray-50'},
+            cell('', el('div', {class: 'flex items-center'},
+                el('i', {class: 'fas fa-user-circle text-2xl text-gray-600 mr-3'}),
+                el('a', {href: user.profile_url, class: 'font-medium text-gray-900 hover:text-blue-600'}, user.username))),
+            cell('text-sm text-gray-600', user.email),
+            cell('', role),
+            cell('text-sm text-gray-600', user.joined),
+            cell('text-sm text-gray-600', String(user.posts)),
+            cell('text-sm', user.delete_url
+                ? deleteForm(user.delete_url, 'Are you sure you want to delete this user and all their content?', 'text-red-600 hover:text-red-900', ' Delete')
+                : null));
+    },
+    posts(post) {
+        return el('div', {class: 'border border-gray-200 rounded-lg p-4 hover:shadow-md transition'},
+            el('div', {class: 'flex items-start justify-between'},
+                el('div', {class: 'flex-1'},
+                    el('div', {class: 'flex items-center space-x-3 mb-2'},
+                        el('span', {class: 'bg-blue-100 text-blue-800 text-xs font-semibold px-3 py-1 rounded-full'}, post.category),
+                        el('span', {class: 'text-gray-500 text-sm'}, 'by ' + post.author),
+                        el('span', {class: 'text-gray-500 text-sm'}, post.created)),
+                    el('h3', {class: 'text-lg font-bold text-gray-800 mb-1'},
+                        el('a', {href: post.view_url, class: 'hover:text-blue-600'}, post.title)),
+                    el('p', {class: 'text-sm text-gray-600'},
+                        el('i', {class: 'fas fa-comments mr-1'}), post.comments + ' comments',
+                        el('i', {class: 'fas fa-share ml-3 mr-1'}), post.shares + ' shares')),
+                deleteForm(post.delete_url, 'Are you sure?', 'text-red-600 hover:text-red-900 px-3 py-1 rounded hover:bg-red-50 ml-4', '')));
+    },
+    comments(comment) {
+        return el('div', {class: 'border border-gray-200 rounded-lg p-4 hover:shadow-md transition'},
+            el('div', {class: 'flex items-start justify-between'},
+                el('div', {class: 'flex-1'},
+                    el('div', {class: 'flex items-center space-x-3 mb-2'},
+                        el('span', {class: 'font-semibold text-gray-800'}, comment.author),
+                        el('span', {class: 'text-gray-500 text-sm'}, 'on'),
+                        el('a', {href: comment.view_url, class: 'text-blue-600 hover:text-blue-700 text-sm'}, comment.post_title),
+                        el('span', {class: 'text-gray-500 text-sm'}, comment.created)),
+                    el('p', {class: 'text-gray-700'}, comment.content)),
+                deleteForm(comment.delete_url, 'Are you sure?', 'text-red-600 hover:text-red-900 px-3 py-1 rounded hover:bg-red-50 ml-4', '')));
+    }
+};
+
+// Per-tab cursor; undefined means the tab has not been opened yet
+const cursors = {};
+
+async function loadPage(tabName) {
+    const container = document.getElementById(tabName + '-content');
+    const button = container.querySelector('.load-more');
+    const url = new URL(container.dataset.url, window.location.origin);
+    if (cursors[tabName]) url.searchParams.set('after', cursors[tabName]);
+    
+    button.disabled = true;
+    let page;
+    try {
+        // An expired session redirects to the login page; treat that as a failure too
+        const response = await fetch(url, {headers: {'Accept': 'application/json'}, redirect: 'error'});
+        if (!response.ok) throw new Error(response.status + ' ' + response.statusText);
+        page = await response.json();
+    } catch (error) {
+        showLoadError(container, button, error);
+        return;
+    }
+    const rows = container.querySelector('.tab-rows');
+    page.items.forEach(item => rows.append(renderers[tabName](item)));
+    
+    const note = container.querySelector('.load-error');
+    if (note) note.remove();
+    cursors[tabName] = page.next_cursor;
+    button.textContent = 'Load more';
+    button.disabled = false;
+    button.classList.toggle('hidden', !page.next_cursor);
+}
+
+// Keep the button as a retry, with a note saying what went wrong
+function showLoadError(container, button, error) {
+    let note = container.querySelector('.load-error');
+    if (!note) {
+        note = el('p', {class: 'load-error mt-6 text-red-600 text-sm', role: 'alert'});
+        button.before(note);
+    }
+    note.textContent = 'Could not load this list (' + error.message + '). ' +
+        'Try again, or reload the page if your session has expired.';
+    button.textContent = 'Retry';
+    button.disabled = false;
+    button.classList.remove('hidden');
+}
+
+function showTab(tabName) {
+    // Hide all tab contents
+    document.querySelectorAll('.tab-content').forEach(content => {
+        content.classList.add('hidden');
+    });
+    
+    // Remove active styling from all tabs
+    document.querySelectorAll('.tab-button').forEach(button => {
+        button.classList.remove('border-blue-500', 'text-blue-600');
+        button.classList.add('border-transparent', 'text-gray-500');
+    });
+    
+    // Show selected tab content
+    document.getElementById(tabName + '-content').classList.remove('hidden');
+    
+    // Add active styling to selected tab
+    const activeTab = document.getElementById(tabName + '-tab');
+    activeTab.classList.remove('border-transparent', 'text-gray-500');
+    activeTab.classList.add('border-blue-500', 'text-blue-600');
+    
+    // Fetch the first page the first time a tab is opened
+    if (!(tabName in cursors)) {
+        cursors[tabName] = null;
+        loadPage(tabName);
+    }
+}
+
+document.querySelectorAll('.load-more').forEach(button => {
+    button.addEventListener('click', () => loadPage(button.closest('.tab-content').id.replace('-content', '')));
+});
+
+showTab('users');
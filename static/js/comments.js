@@ -0,0 +1,44 @@
+// Older comments load as the reader scrolls to the end of the list; the
+// link itself (?comments_after=...) still works without JavaScript
+const moreComments = document.getElementById('more-comments');
+
+async function loadComments() {
+    if (moreComments.dataset.loading) return;
+    moreComments.dataset.loading = '1';
+
+    const url = new URL(moreComments.dataset.url, window.location.origin);
+    url.searchParams.set('after', moreComments.dataset.cursor);
+    try {
+        const response = await fetch(url, {headers: {'Accept': 'application/json'}});
+        if (!response.ok) throw new Error(response.statusText);
+        const page = await response.json();
+        document.getElementById('comment-list').insertAdjacentHTML('beforeend', page.html);
+
+        if (page.next_cursor) {
+            moreComments.dataset.cursor = page.next_cursor;
+            moreComments.href = moreComments.href.replace(/comments_after=[^&]*/, 'comments_after=' + page.next_cursor);
+        } else {
+            observer.disconnect();
+            moreComments.remove();
+        }
+    } catch (error) {
+        // Leave the link for a manual retry
+        observer.disconnect();
+    } finally {
+        delete moreComments.dataset.loading;
+    }
+}
+
+const observer = moreComments && 'IntersectionObserver' in window
+    ? new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) loadComments();
+    }, {rootMargin: '400px'})
+    : null;
+
+if (observer) {
+    observer.observe(moreComments);
+    moreComments.addEventListener('click', event => {
+        event.preventDefault();
+        loadComments();
+    });
+}
@@ -0,0 +1,91 @@
+// Comment, delete-comment and share forms post to their JSON variants
+// (data-api) and update the page in place. If the request never reaches the
+// server the form is submitted normally, which redirects back with a flash
+// message; once the server has answered, even with an error, it is never
+// submitted again (it may already have acted), so nothing is posted twice.
+function setCount(name, value) {
+    document.querySelectorAll('[data-count="' + name + '"]').forEach(node => {
+        node.textContent = value;
+    });
+}
+
+const applyResult = {
+    add_comment(form, result) {
+        document.getElementById('comment-list').insertAdjacentHTML('afterbegin', result.html);
+        const empty = document.getElementById('no-comments');
+        if (empty) empty.remove();
+        form.reset();
+        setCount('comments', result.comment_count);
+    },
+    delete_comment(form, result) {
+        form.closest('.comment-card').remove();
+        setCount('comments', result.comment_count);
+    },
+    share_post(form, result) {
+        setCount('shares', result.share_count);
+        form.querySelector('button').title = result.message;
+    }
+};
+
+function showError(form, message) {
+    let note = form.querySelector('[data-form-error]');
+    if (!note) {
+        note = document.createElement('p');
+        note.dataset.formError = '';
+        note.className = 'text-red-600 text-sm mt-2';
+        note.setAttribute('role', 'alert');
+        form.appendChild(note);
+    }
+    note.textContent = message;
+}
+
+async function errorMessage(response) {
+    try {
+        const body = await response.json();
+        if (body.error) return body.error;
+    } catch (error) {
+        // Not JSON, e.g. a proxy error page
+    }
+    return 'Something went wrong. Reload the page to see whether it went through.';
+}
+
+function actionOf(form) {
+    if (form.closest('.comment-card')) return 'delete_comment';
+    return form.querySelector('textarea[name="content"]') ? 'add_comment' : 'share_post';
+}
+
+document.addEventListener('submit', async event => {
+    const form = event.target;
+    // Skip forms without a JSON variant, and deletes the reader cancelled
+    if (!form.dataset.api || event.defaultPrevented) return;
+    event.preventDefault();
+
+    const button = form.querySelector('button[type="submit"]');
+    button.disabled = true;
+    let response;
+    try {
+        response = await fetch(form.dataset.api, {
+            method: 'POST',
+            body: new FormData(form),
+            headers: {'Accept': 'application/json'},
+            redirect: 'error'
+        });
+    } catch (error) {
+        form.submit();
+        return;
+    }
+    try {
+        if (!response.ok) {
+            showError(form, await errorMessage(response));
+            return;
+        }
+        const note = form.querySelector('[data-form-error]');
+        if (note) note.remove();
+        applyResult[actionOf(form)](form, await response.json());
+    } catch (error) {
+        // The action went through; only the in-place update failed
+        window.location.reload();
+    } finally {
+        button.disabled = false;
+    }
+});
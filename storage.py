@@ -0,0 +1,185 @@
+"""
+Upload storage backends
+The app only talks to a Storage: put/get/delete/exists/url/stream by name.
+LocalStorage keeps files under static/uploads as before; S3Storage puts them
+in any S3-compatible bucket (AWS, MinIO, R2, ...) and links pages to a public
+bucket endpoint or CDN so app workers never serve image bytes.
+Select with STORAGE_BACKEND=local|s3 (see storage_from_config).
+"""
+import mimetypes
+import os
+import shutil
+import tempfile
+from flask import current_app, url_for
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+CHUNK_SIZE = 64 * 1024
+
+# Stored names are content hashes, so a URL's bytes never change
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+def guess_type(name):
+    return mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+class Storage:
+    """Interface every upload backend implements"""
+
+    def put(self, name, fileobj, content_type=None):
+        """Store the remaining bytes of ``fileobj`` as ``name``, replacing it atomically"""
+        raise NotImplementedError
+
+    def get(self, name):
+        """Return the bytes stored as ``name``"""
+        raise NotImplementedError
+
+    def stream(self, name, chunk_size=CHUNK_SIZE):
+        """Yield the bytes stored as ``name`` in chunks"""
+        raise NotImplementedError
+
+    def exists(self, name):
+        raise NotImplementedError
+
+    def delete(self, name):
+        """Remove ``name``; missing files are ignored"""
+        raise NotImplementedError
+
+    def url(self, name):
+        """Stable URL a browser can fetch ``name`` from directly; pages and their caches embed it"""
+        raise NotImplementedError
+
+class LocalStorage(Storage):
+    """Files in a directory served by Flask's static route (or a front-end server)"""
+
+    def __init__(self, root, static_prefix='uploads/'):
+        self.root = root
+        self.static_prefix = static_prefix
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def put(self, name, fileobj, content_type=None):
+        # A staged upload already on this disk is renamed rather than copied
+        claim = getattr(fileobj, 'claim', None)
+        if claim is not None and os.path.dirname(fileobj.path) == self.root:
+            claim(self.path(name))
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(fileobj, f, CHUNK_SIZE)
+            os.replace(tmp_path, self.path(name))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def get(self, name):
+        with open(self.path(name), 'rb') as f:
+            return f.read()
+
+    def stream(self, name, chunk_size=CHUNK_SIZE):
+        with open(self.path(name), 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield chunk
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def delete(self, name):
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def url(self, name):
+        return url_for('static', filename=self.static_prefix + name)
+
+class S3Storage(Storage):
+    """
+    Objects in an S3-compatible bucket
+
+    Pages link to ``public_url`` (a CDN or public bucket endpoint), so image
+    URLs never change and cached pages, browsers and CDNs can all keep them.
+    A presigned URL would expire while a cached page or a 304 still pointed
+    at it, so those are only handed out by presigned_url() for one-off
+    private downloads.
+    """
+
+    def __init__(self, bucket, prefix='uploads/', endpoint_url=None, region=None,
+                 public_url=None, url_expires=3600, **client_options):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs boto3: pip install boto3")
+        if not public_url:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs S3_PUBLIC_URL, the public bucket or CDN URL pages link images to")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.public_url = public_url.rstrip('/')
+        self.url_expires = url_expires
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region, **client_options)
+
+    def key(self, name):
+        return self.prefix + name
+
+    def put(self, name, fileobj, content_type=None):
+        # Objects appear atomically once the upload completes
+        self.client.upload_fileobj(fileobj, self.bucket, self.key(name), ExtraArgs={
+            'ContentType': content_type or guess_type(name),
+            'CacheControl': IMMUTABLE_CACHE_CONTROL,
+        })
+
+    def get(self, name):
+        return self.client.get_object(Bucket=self.bucket, Key=self.key(name))['Body'].read()
+
+    def stream(self, name, chunk_size=CHUNK_SIZE):
+        body = self.client.get_object(Bucket=self.bucket, Key=self.key(name))['Body']
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def exists(self, name):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(name))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return True
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(name))
+
+    def url(self, name):
+        return f"{self.public_url}/{self.key(name)}"
+
+    def presigned_url(self, name, expires=None):
+        """Short-lived URL for a private download; never embed it in a page"""
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self.key(name)},
+            ExpiresIn=expires or self.url_expires
+        )
+
+def storage_from_config(config):
+    """Build the backend named by config['STORAGE_BACKEND']"""
+    backend = config.get('STORAGE_BACKEND', 'local')
+    if backend == 'local':
+        return LocalStorage(config['UPLOAD_FOLDER'])
+    if backend == 's3':
+        return S3Storage(
+            bucket=config['S3_BUCKET'],
+            prefix=config.get('S3_PREFIX', 'uploads/'),
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region=config.get('S3_REGION'),
+            public_url=config.get('S3_PUBLIC_URL'),
+            url_expires=config.get('S3_URL_EXPIRES', 3600),
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}")
+
+def get_storage():
+    """The storage backend of the current app"""
+    return current_app.extensions['storage']
@@ -0,0 +1,25 @@
+"""
+Delete uploads no post has used for a while
+Posts only release their images; the Upload row and its file (with its
+variants) stay until nothing has used them for UPLOAD_SWEEP_GRACE seconds, so
+an upload of the same image in the meantime can still reuse them. Run it from
+cron, e.g. hourly. Safe to run alongside the app.
+Usage: python sweep_uploads.py [grace_seconds]
+"""
+import sys
+from app import app, db
+from migrate_schema import require_migrations
+from uploads import sweep_uploads
+
+if __name__ == '__main__':
+    try:
+        with app.app_context():
+            # Upload.released_at
+            require_migrations(9)
+            grace = int(sys.argv[1]) if len(sys.argv) > 1 else app.config['UPLOAD_SWEEP_GRACE']
+            removed = sweep_uploads(app.extensions['storage'], grace)
+        print(f"✅ Removed {removed} uploads unused for {grace} seconds")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        print("Please make sure the database file is not locked by another process.")
+        sys.exit(1)
@@ -0,0 +1,6 @@
+/** Tailwind build config used by build_assets.py; scans every class the app renders */
+module.exports = {
+  content: ['./templates/**/*.html', './static/js/**/*.js'],
+  theme: { extend: {} },
+  plugins: [],
+}
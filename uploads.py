@@ -0,0 +1,179 @@
+"""
+Content-addressed upload storage
+Each upload streams in fixed-size chunks to a temp file in the upload
+folder before it is handed to the storage backend. While it streams, its type is sniffed from its magic bytes, its size
+is checked and its SHA-256 is computed. It is then stored as <sha256>.<ext>, so identical images are kept once no matter how many posts
+use them. Upload.ref_count tracks those posts; files nothing has used for
+UPLOAD_SWEEP_GRACE seconds are removed by sweep_uploads.
+"""
+import hashlib
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta
+from flask import Request, current_app
+from models import db, Upload, insert_ignore
+from images import remove_variants
+from storage import get_storage, guess_type
+
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of each accepted image type -> stored extension
+MAGIC_BYTES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+SNIFF_BYTES = 12
+
+def sniff_image_type(head):
+    """Extension for the image type ``head`` starts with, or None"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for magic, ext in MAGIC_BYTES:
+        if head.startswith(magic):
+            return ext
+    return None
+
+class UploadRejected(Exception):
+    """Raised mid-stream so the rest of a bad upload is never read"""
+
+class StagedUpload(io.FileIO):
+    """
+    Temp file that validates and hashes an upload as it is written
+    Only one chunk is held in memory at a time; the temp file is removed on
+    close unless claim() has moved it into place.
+    """
+
+    def __init__(self, folder, max_size):
+        fd, self.path = tempfile.mkstemp(dir=folder, suffix='.part')
+        super().__init__(fd, 'r+b')
+        self.max_size = max_size
+        self.size = 0
+        self.ext = None
+        self.claimed = False
+        self._head = b''
+        self._digest = hashlib.sha256()
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def write(self, data):
+        if self.ext is None and len(self._head) < SNIFF_BYTES:
+            self._head += bytes(data[:SNIFF_BYTES - len(self._head)])
+            if len(self._head) >= SNIFF_BYTES:
+                self._check_type()
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.close()
+            raise UploadRejected(f'Image is too large (maximum {self.max_size // (1024 * 1024)} MB).')
+        self._digest.update(data)
+        view = memoryview(data)
+        written = 0
+        while written < len(view):
+            written += super().write(view[written:])
+        return written
+
+    def _check_type(self):
+        self.ext = sniff_image_type(self._head)
+        if self.ext is None:
+            self.close()
+            raise UploadRejected('Invalid image file. Allowed formats: PNG, JPG, JPEG, GIF, WEBP')
+
+    def finish(self):
+        """Validate a short upload that never filled the sniffing buffer"""
+        if self.ext is None:
+            self._check_type()
+
+    def claim(self, path):
+        """Atomically move the finished upload to ``path``"""
+        self.claimed = True
+        super().close()
+        os.replace(self.path, path)
+
+    def close(self):
+        super().close()
+        if not self.claimed and os.path.exists(self.path):
+            os.remove(self.path)
+
+class UploadRequest(Request):
+    """Request whose file parts stream straight into a StagedUpload"""
+
+    # Plain form fields are still buffered, but never more than this
+    max_form_memory_size = 1024 * 1024
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        config = current_app.config
+        return StagedUpload(config['UPLOAD_FOLDER'], config['MAX_IMAGE_SIZE'])
+
+def stage_stream(stream, folder, max_size):
+    """Copy any readable stream through a StagedUpload, for uploads made outside a request"""
+    staged = StagedUpload(folder, max_size)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        staged.write(chunk)
+    return staged
+
+def claim_upload(upload):
+    """
+    Lock an existing Upload row for reuse in the current transaction; False if
+    sweep_uploads has already deleted it. A row nothing uses yet has its
+    grace period restarted, so the sweep leaves it alone until the post commits.
+    """
+    upload_table = Upload.__table__
+    claimed = db.session.connection().execute(
+        upload_table.update()
+        .where(upload_table.c.id == upload.id)
+        .values(released_at=db.case((upload_table.c.ref_count > 0, None), else_=datetime.utcnow()))
+    ).rowcount
+    db.session.expire(upload)
+    return bool(claimed)
+
+def store_upload(staged, storage):
+    """Put a finished StagedUpload into ``storage`` under its content hash and return its Upload row"""
+    try:
+        staged.finish()
+        sha256 = staged.sha256
+        upload = Upload.query.filter_by(sha256=sha256).first()
+        if upload is not None and not claim_upload(upload):
+            upload = None
+        filename = upload.filename if upload else f"{sha256}.{staged.ext}"
+        # Checked after the claim: a sweep that got there first has removed the file too
+        if not (upload and storage.exists(filename)):
+            staged.seek(0)
+            storage.put(filename, staged, guess_type(filename))
+    finally:
+        # Removes the temp file unless LocalStorage renamed it into place
+        staged.close()
+
+    if upload is None:
+        # Two identical uploads can race here; the unique sha256 settles it
+        insert_ignore(db.session.connection(), Upload.__table__, sha256=sha256, filename=filename,
+                      size=staged.size, ref_count=0, released_at=datetime.utcnow())
+        upload = Upload.query.filter_by(sha256=sha256).one()
+    return upload
+
+def sweep_uploads(storage, grace):
+    """
+    Delete Upload rows that have had no posts for ``grace`` seconds, with their
+    files and variants; returns how many went. Each row is deleted before its
+    file and committed after it, so a store_upload claiming the same row waits
+    for the commit and then stores the file again.
+    """
+    upload_table = Upload.__table__
+    cutoff = datetime.utcnow() - timedelta(seconds=grace)
+    unused = (upload_table.c.ref_count <= 0) & (upload_table.c.released_at < cutoff)
+    filenames = db.session.execute(db.select(upload_table.c.filename).where(unused)).scalars().all()
+    db.session.commit()
+    removed = 0
+    for filename in filenames:
+        deleted = db.session.execute(
+            upload_table.delete().where(upload_table.c.filename == filename, unused)
+        ).rowcount
+        if deleted:
+            storage.delete(filename)
+            remove_variants(storage, filename)
+            removed += 1
+        db.session.commit()
+    return removed
@@ -0,0 +1,129 @@
+"""
+Cached identity for Flask-Login
+load_user() answers from a short-TTL, bounded cache of (id, username,
+is_admin, session_version) instead of querying the user table on every
+request. Sessions store "<id>:<session_version>"; changing a user's password
+or admin flag bumps session_version, so sessions issued before the change
+stop loading. Commits that change or delete a user invalidate its entry
+straight away in this process (and on the host, with the filesystem
+backend); other hosts see the change within USER_CACHE_TTL.
+"""
+import os
+from flask_login import UserMixin
+from sqlalchemy import inspect
+from models import db, User
+from database import primary_reads
+from page_cache import MemoryCache, FileSystemCache
+
+# Changing any of these ends the user's existing sessions
+PRIVILEGE_COLUMNS = ('password_hash', 'is_admin')
+
+def parse_user_id(value):
+    """(id, session_version) from a session's user id; pre-version sessions are version 0"""
+    user_id, _, version = str(value).partition(':')
+    return int(user_id), int(version or 0)
+
+def _tag(user_id):
+    return f'user:{user_id}'
+
+class CachedUser(UserMixin):
+    """
+    The logged-in user as far as most requests need it. Any other attribute
+    (email, posts, ...) loads the full User row on first use.
+    """
+
+    def __init__(self, id, username, is_admin, session_version):
+        self.id = id
+        self.username = username
+        self.is_admin = is_admin
+        self.session_version = session_version
+
+    def get_id(self):
+        return f'{self.id}:{self.session_version}'
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        user = self.__dict__.get('_user')
+        if user is None:
+            user = self.__dict__['_user'] = db.session.get(User, self.id)
+        return getattr(user, name)
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+class UserCache:
+    """Flask glue: a user_loader backed by the identity cache"""
+
+    def __init__(self, app=None, login_manager=None):
+        self.backend = None
+        self.ttl = 30
+        if app is not None:
+            self.init_app(app, login_manager)
+
+    def init_app(self, app, login_manager):
+        backend = app.config.get('USER_CACHE_BACKEND', 'memory')
+        self.ttl = app.config.get('USER_CACHE_TTL', 30)
+        max_entries = app.config.get('USER_CACHE_MAX_ENTRIES', 10000)
+        if backend == 'memory':
+            self.backend = MemoryCache(max_entries=max_entries, default_ttl=self.ttl)
+        elif backend == 'filesystem':
+            directory = app.config.get('USER_CACHE_DIR') or os.path.join(app.instance_path, 'user_cache')
+            self.backend = FileSystemCache(directory, max_entries=max_entries, default_ttl=self.ttl)
+        else:
+            self.backend = None
+        login_manager.user_loader(self.load_user)
+        db.event.listen(db.session, 'before_flush', self._bump_versions)
+        db.event.listen(db.session, 'after_commit', self._invalidate_committed)
+        db.event.listen(db.session, 'after_soft_rollback', self._forget_changes)
+
+    def identity(self, user_id):
+        """(id, username, is_admin, session_version) for ``user_id``, or None"""
+        if self.backend is not None:
+            cached = self.backend.get(_tag(user_id))
+            if cached is not None:
+                return cached
+            # Read before the query, so a change committed meanwhile is not cached over
+            versions = self.backend.tag_versions([_tag(user_id)])
+        # Cached for every later request, so never from a lagging replica
+        with primary_reads():
+            row = db.session.query(User.id, User.username, User.is_admin, User.session_version) \
+                .filter(User.id == user_id).first()
+        if row is None:
+            return None
+        identity = (row.id, row.username, bool(row.is_admin), row.session_version or 0)
+        if self.backend is not None:
+            self.backend.set(_tag(user_id), identity, tags=[_tag(user_id)], versions=versions)
+        return identity
+
+    def load_user(self, value):
+        try:
+            user_id, version = parse_user_id(value)
+        except ValueError:
+            return None
+        identity = self.identity(user_id)
+        # A session from before a password or privilege change
+        if identity is None or identity[3] != version:
+            return None
+        return CachedUser(*identity)
+
+    def invalidate(self, *user_ids):
+        if self.backend is not None and user_ids:
+            self.backend.invalidate_tags(*(_tag(user_id) for user_id in user_ids))
+
+    def _bump_versions(self, session, flush_context, instances):
+        stale = session.info.setdefault('stale_users', set())
+        for user in session.dirty:
+            if not isinstance(user, User):
+                continue
+            state = inspect(user)
+            if any(state.attrs[name].history.has_changes() for name in PRIVILEGE_COLUMNS):
+                user.session_version = (user.session_version or 0) + 1
+            stale.add(user.id)
+        stale.update(user.id for user in session.deleted if isinstance(user, User))
+
+    def _invalidate_committed(self, session):
+        self.invalidate(*session.info.pop('stale_users', ()))
+
+    def _forget_changes(self, session, previous_transaction):
+        session.info.pop('stale_users', None)